@@ -1,4 +1,4 @@
-from os import getenv
+from os import cpu_count, environ, getenv
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,13 +16,24 @@ class Config:
         self.OWNER_ID = int(getenv("OWNER_ID", 0))
 
         self.DURATION_LIMIT = int(getenv("DURATION_LIMIT", 60)) * 60
-        self.QUEUE_LIMIT = int(getenv("QUEUE_LIMIT", 20))
-        self.PLAYLIST_LIMIT = int(getenv("PLAYLIST_LIMIT", 20))
+        # Queued playlist entries are lazy, so long queues stay cheap
+        self.QUEUE_LIMIT = int(getenv("QUEUE_LIMIT", 2000))
+        self.PLAYLIST_LIMIT = int(getenv("PLAYLIST_LIMIT", 1000))
         self.FILE_SIZE_LIMIT = int(getenv("FILE_SIZE_LIMIT", 200)) * 1024 * 1024
+        self.PREFETCH_DEPTH = int(getenv("PREFETCH_DEPTH", 2))
+        self.DOWNLOAD_CONCURRENCY = int(getenv("DOWNLOAD_CONCURRENCY", 3))
+        self.DOWNLOAD_PER_HOST = int(getenv("DOWNLOAD_PER_HOST", 0))
+        self.YTDL_WORKERS = int(getenv("YTDL_WORKERS", min(4, cpu_count() or 1)))
 
-        self.SESSION1 = getenv("SESSION", None)
-        self.SESSION2 = getenv("SESSION2", None)
-        self.SESSION3 = getenv("SESSION3", None)
+        # SESSION (or SESSION1) is the first assistant, SESSION2..SESSIONn the rest.
+        self.SESSION1 = getenv("SESSION", None) or getenv("SESSION1", None)
+        numbered = sorted(
+            (int(key[7:]), value)
+            for key, value in environ.items()
+            if key[:7] == "SESSION" and key[7:].isdigit() and int(key[7:]) > 1 and value
+        )
+        self.SESSIONS = [self.SESSION1] * bool(self.SESSION1) + [value for _, value in numbered]
+        self.ASSISTANT_CAPACITY = int(getenv("ASSISTANT_CAPACITY", 0))
 
         self.DONATE_QR_IMAGE = getenv("DONATE_QR_IMAGE", "https://files.catbox.moe/2d927j.jpg")
 
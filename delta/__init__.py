@@ -34,6 +34,10 @@ config.check()
 tasks = []
 boot = time.time()
 
+# Forks the yt-dlp workers, so it has to come before anything starts a thread
+from delta.core.workers import WorkerPool
+workers = WorkerPool()
+
 from delta.core.bot import Bot
 app = Bot()
 
@@ -46,6 +50,9 @@ userbot = Userbot()
 from delta.core.mongo import MongoDB
 db = MongoDB()
 
+from delta.core.scheduler import DownloadScheduler
+scheduler = DownloadScheduler()
+
 from delta.core.telegram import Telegram
 from delta.core.youtube import YouTube
 tg = Telegram()
@@ -55,9 +62,18 @@ yt = YouTube()
 from delta.helpers._queue import Queue
 queue = Queue()
 
+from delta.helpers._clock import PlaybackClock
+clock = PlaybackClock()
+
+from delta.core.prefetch import Prefetcher
+prefetch = Prefetcher()
+
 from delta.core.calls import TgCall
 anon = TgCall()
 
+from delta.core.journal import QueueJournal
+journal = QueueJournal()
+
 
 # These are initialized lazily in __main__.py to avoid circular imports
 # cleanup = None
@@ -73,8 +89,10 @@ async def stop() -> None:
         except:
             pass
 
+    journal.save()
     await app.exit()
     await userbot.exit()
     await db.close()
+    workers.shutdown()
 
     logger.info("Stopped.\n")
@@ -8,13 +8,14 @@ import importlib
 
 from pyrogram import idle
 
-from delta import (anon, app, config, db,
-                   logger, stop, userbot, yt, tasks)
+from delta import (anon, app, config, db, journal,
+                   logger, prefetch, stop, userbot, yt, tasks)
 from delta.plugins import all_modules
 
 
 async def main():
     await db.connect()
+    await yt.cache.ensure_indexes()
     
     # Startup banner
     logger.info("🎵 ═══════════ DELTA MUSIC BOT v3.0.1 ═══════════ 🎵")
@@ -23,6 +24,9 @@ async def main():
     await app.boot()
     await userbot.boot()
     await anon.boot()
+    await db.reconcile_calls(await anon.live_calls())
+    tasks.append(asyncio.create_task(journal.start()))
+    tasks.append(asyncio.create_task(prefetch.start()))
 
     for module in all_modules:
         importlib.import_module(f"delta.plugins.{module}")
@@ -31,6 +35,9 @@ async def main():
     if config.COOKIES_URL:
         await yt.save_cookies(config.COOKIES_URL)
 
+    # Handlers and cookies are in place, so resuming can run alongside them
+    tasks.append(asyncio.create_task(journal.restore(anon)))
+
     sudoers = await db.get_sudoers()
     app.sudoers.update(sudoers)
     app.bl_users.update(await db.get_blacklisted())
@@ -0,0 +1,237 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+
+import asyncio
+from time import monotonic, time
+
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from delta import logger
+
+
+class WriteBuffer:
+    """
+    Write-behind buffer for MongoDB upserts.
+
+    Increments and field updates are merged in memory per document and
+    flushed as one unordered ``bulk_write`` per collection, either when
+    ``max_pending`` documents are dirty or every ``interval`` seconds.
+    Replacements and deletes are last-write-wins per document; a write
+    queued after a delete recreates the document from scratch.
+    """
+
+    def __init__(self, max_pending: int = 500, interval: float = 5.0):
+        """
+        Args:
+            max_pending: Number of dirty documents that triggers an early flush.
+            interval: Maximum number of seconds a write waits in memory.
+        """
+        self.max_pending = max_pending
+        self.interval = interval
+        self.collections = {}
+        self.pending: dict[str, dict] = {}
+        self.oldest = 0.0
+        self.wakeup = asyncio.Event()
+        self.lock = asyncio.Lock()
+
+        self.flushes = 0
+        self.flushed_ops = 0
+        self.errors = 0
+        self.dropped = 0
+        self.last_flush = 0.0
+        self.last_flush_ms = 0.0
+
+    def _entry(self, collection, _id) -> dict:
+        name = collection.name
+        self.collections[name] = collection
+        docs = self.pending.setdefault(name, {})
+        if not self.oldest:
+            self.oldest = monotonic()
+        return docs.setdefault(_id, {})
+
+    def _queued(self) -> None:
+        if self.size >= self.max_pending:
+            self.wakeup.set()
+
+    def inc(self, collection, _id, fields: dict, set_fields: dict = None) -> None:
+        """Queue ``$inc`` (and optionally ``$set``) operations on a document."""
+        entry = self._entry(collection, _id)
+        if entry.pop("$delete", None):
+            entry["$replace"] = {}
+        if "$replace" in entry:
+            doc = entry["$replace"]
+            for key, value in fields.items():
+                doc[key] = doc.get(key, 0) + value
+            doc.update(set_fields or {})
+        else:
+            incs = entry.setdefault("$inc", {})
+            for key, value in fields.items():
+                incs[key] = incs.get(key, 0) + value
+            if set_fields:
+                entry.setdefault("$set", {}).update(set_fields)
+        self._queued()
+
+    def set(self, collection, _id, fields: dict) -> None:
+        """Queue a ``$set`` on a document; later values win."""
+        entry = self._entry(collection, _id)
+        if entry.pop("$delete", None):
+            entry["$replace"] = {}
+        if "$replace" in entry:
+            for path, value in fields.items():
+                self._assign(entry["$replace"], path, value)
+        else:
+            entry.setdefault("$set", {}).update(fields)
+        self._queued()
+
+    @staticmethod
+    def _assign(doc: dict, path: str, value) -> None:
+        # Apply a dotted $set path such as "items.3" to a replacement document
+        *parents, last = path.split(".")
+        for part in parents:
+            doc = doc[int(part)] if isinstance(doc, list) else doc.setdefault(part, {})
+        if not isinstance(doc, list):
+            doc[last] = value
+        elif int(last) == len(doc):
+            doc.append(value)
+        else:
+            doc[int(last)] = value
+
+    def insert(self, collection, _id, fields: dict = None) -> None:
+        """Queue an upsert that only writes ``fields`` if the document is new."""
+        entry = self._entry(collection, _id)
+        if entry.pop("$delete", None):
+            entry["$replace"] = dict(fields or {})
+        elif "$replace" not in entry:
+            entry.setdefault("$setOnInsert", {"_id": _id}).update(fields or {})
+        self._queued()
+
+    def replace(self, collection, _id, doc: dict) -> None:
+        """Queue an upserting replacement of a whole document."""
+        entry = self._entry(collection, _id)
+        entry.clear()
+        entry["$replace"] = dict(doc)
+        self._queued()
+
+    def delete(self, collection, _id) -> None:
+        """Queue the removal of a document, discarding pending writes to it."""
+        entry = self._entry(collection, _id)
+        entry.clear()
+        entry["$delete"] = True
+        self._queued()
+
+    def peek(self, collection, _id, field: str) -> int:
+        """Return the not yet flushed increment of a field."""
+        entry = self.pending.get(collection.name, {}).get(_id, {})
+        return entry.get("$inc", {}).get(field, 0)
+
+    def view(self, collection, _id, doc: dict | None) -> dict | None:
+        """Return a stored document with the writes still pending for it applied."""
+        entry = self.pending.get(collection.name, {}).get(_id)
+        if not entry:
+            return doc
+        if "$delete" in entry:
+            return None
+        if "$replace" in entry:
+            return {"_id": _id, **entry["$replace"]}
+        doc = dict(doc or {"_id": _id, **entry.get("$setOnInsert", {})})
+        for key, value in entry.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + value
+        doc.update(entry.get("$set", {}))
+        return doc
+
+    @property
+    def size(self) -> int:
+        """Number of dirty documents waiting to be flushed."""
+        return sum(len(docs) for docs in self.pending.values())
+
+    def metrics(self) -> dict:
+        """Return flush backlog and throughput counters."""
+        return {
+            "pending": self.size,
+            "collections": {name: len(docs) for name, docs in self.pending.items()},
+            "oldest_age": round(monotonic() - self.oldest, 2) if self.oldest else 0,
+            "flushes": self.flushes,
+            "flushed_ops": self.flushed_ops,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "last_flush": self.last_flush,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+    def _requeue(self, name: str, docs: dict) -> None:
+        """Merge a failed batch back under any writes queued since."""
+        current = self.pending.setdefault(name, {})
+        for _id, update in docs.items():
+            if "$replace" in update or "$delete" in update:
+                current.setdefault(_id, update)
+                continue
+            entry = current.setdefault(_id, {})
+            if "$replace" in entry or "$delete" in entry:
+                continue
+            for key, value in update.get("$inc", {}).items():
+                incs = entry.setdefault("$inc", {})
+                incs[key] = incs.get(key, 0) + value
+            if "$set" in update:
+                entry["$set"] = {**update["$set"], **entry.get("$set", {})}
+            if "$setOnInsert" in update:
+                entry["$setOnInsert"] = {**update["$setOnInsert"], **entry.get("$setOnInsert", {})}
+        if not self.oldest:
+            self.oldest = monotonic()
+
+    @staticmethod
+    def _op(_id, entry: dict):
+        if "$delete" in entry:
+            return DeleteOne({"_id": _id})
+        if "$replace" in entry:
+            return ReplaceOne({"_id": _id}, entry["$replace"], upsert=True)
+        return UpdateOne({"_id": _id}, entry, upsert=True)
+
+    async def flush(self) -> None:
+        """Write every pending document to MongoDB."""
+        async with self.lock:
+            if not self.pending:
+                return
+
+            batch, self.pending, self.oldest = self.pending, {}, 0.0
+            start = monotonic()
+            written = 0
+
+            for name, docs in batch.items():
+                ids = list(docs)
+                ops = [self._op(_id, docs[_id]) for _id in ids]
+                try:
+                    await self.collections[name].bulk_write(ops, ordered=False)
+                    written += len(ops)
+                except BulkWriteError as e:
+                    # Rejected documents would be rejected again, drop them.
+                    self.errors += 1
+                    failed = len(e.details.get("writeErrors", []))
+                    written += len(ops) - failed
+                    self.dropped += failed
+                    logger.warning(f"Buffered write to {name} partially failed: {failed} ops dropped.")
+                except Exception as e:
+                    self.errors += 1
+                    self._requeue(name, docs)
+                    logger.warning(f"Buffered write to {name} failed, requeued: {e}")
+
+            self.flushes += 1
+            self.flushed_ops += written
+            self.last_flush = time()
+            self.last_flush_ms = round((monotonic() - start) * 1000, 2)
+
+    async def start(self) -> None:
+        """Flush on the size trigger or every interval until cancelled."""
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                # Shielded so a shutdown never drops a batch mid-write.
+                await asyncio.shield(self.flush())
+            except Exception as e:
+                logger.error(f"Write buffer flush error: {e}")
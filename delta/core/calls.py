@@ -3,6 +3,9 @@
 # This file is part of AnonXMusic
 
 
+import asyncio
+from time import monotonic
+
 from ntgcalls import (ConnectionNotFound, TelegramServerError,
                       RTMPStreamingUnsupported)
 from pyrogram import enums, errors, types
@@ -11,38 +14,62 @@ from pyrogram.types import InputMediaPhoto, Message
 from pytgcalls import PyTgCalls, exceptions, types
 from pytgcalls.pytgcalls_session import PyTgCallsSession
 
-from delta import app, config, db, logger, queue, userbot, yt
-from delta.helpers import Media, Track, buttons, thumb
+from delta import app, clock, config, db, logger, prefetch, queue, scheduler, userbot, yt
+from delta.helpers import LazyTrack, Media, StageTimings, Track, buttons, thumb
 
 
 class TgCall(PyTgCalls):
     def __init__(self):
         self.clients = []
+        self.resolving = {}
+        self.background = set()
+        self.timings = StageTimings()
+
+    async def resolve(self, chat_id: int, media: Media | Track | LazyTrack) -> Media | Track | None:
+        """Turn a lazy queue entry into a Track and swap it into the queue."""
+        if not isinstance(media, LazyTrack):
+            return media
+        # Playback and the lookahead may ask for the same entry at once.
+        task = self.resolving.get(id(media))
+        if not task:
+            task = self.resolving[id(media)] = asyncio.ensure_future(yt.resolve(media))
+            task.add_done_callback(lambda _: self.resolving.pop(id(media), None))
+        track = await asyncio.shield(task)
+        if track:
+            queue.replace(chat_id, media, track)
+        return track
 
     async def pause(self, chat_id: int) -> bool:
         client = await db.get_assistant(chat_id)
         await db.playing(chat_id, paused=True)
+        clock.pause(chat_id)
         return await client.pause(chat_id)
 
     async def resume(self, chat_id: int) -> bool:
         client = await db.get_assistant(chat_id)
         await db.playing(chat_id, paused=False)
+        clock.resume(chat_id)
         return await client.resume(chat_id)
 
     async def seek(self, chat_id: int, seconds: int) -> bool:
         """Seek forward (+) or backward (-) by the specified number of seconds."""
         client = await db.get_assistant(chat_id)
+        media = queue.get_current(chat_id)
+        position = clock.elapsed(chat_id)
+        if not media or position is None or not media.duration_sec:
+            return False
+
+        new_time = min(max(0, position + seconds), media.duration_sec - 1)
         try:
-            # Get current playback time
-            current_time = await client.get_active_call(chat_id)
-            if not current_time:
-                return False
-            
-            # Calculate new position (in milliseconds)
-            new_time = max(0, current_time.time + (seconds * 1000))
-            
-            # Seek to new position
-            await client.seeked(chat_id, new_time)
+            await client.play(
+                chat_id=chat_id,
+                stream=self.stream(media, new_time),
+                config=types.GroupCallConfig(auto_start=False),
+            )
+            # Replaying the stream also resumes a paused call.
+            if clock.is_paused(chat_id):
+                await db.playing(chat_id, paused=False)
+            clock.start(chat_id, new_time)
             return True
         except Exception as e:
             logger.error(f"Seek error: {e}")
@@ -50,6 +77,8 @@ class TgCall(PyTgCalls):
 
     async def stop(self, chat_id: int) -> None:
         client = await db.get_assistant(chat_id)
+        clock.stop(chat_id)
+        prefetch.cancel(chat_id)
         try:
             queue.clear(chat_id)
             await db.remove_call(chat_id)
@@ -62,24 +91,8 @@ class TgCall(PyTgCalls):
             pass
 
 
-    async def play_media(
-        self,
-        chat_id: int,
-        message: Message,
-        media: Media | Track,
-        seek_time: int = 0,
-    ) -> None:
-        client = await db.get_assistant(chat_id)
-        _thumb = (
-            await thumb.generate(media)
-            if isinstance(media, Track)
-            else config.DEFAULT_THUMB
-        )
-
-        if not media.file_path:
-            return await message.edit_text(f"File tidak ditemukan. Hubungi <a href='tg://user?id={config.OWNER_ID}'>owner</a>", parse_mode=enums.ParseMode.HTML)
-
-        stream = types.MediaStream(
+    def stream(self, media: Media | Track, seek_time: int = 0) -> types.MediaStream:
+        return types.MediaStream(
             media_path=media.file_path,
             audio_parameters=types.AudioQuality.HIGH,
             video_parameters=types.VideoQuality.HD_720p,
@@ -91,61 +104,34 @@ class TgCall(PyTgCalls):
             ),
             ffmpeg_parameters=f"-ss {seek_time}" if seek_time > 1 else None,
         )
+
+    async def play_media(
+        self,
+        chat_id: int,
+        message: Message,
+        media: Media | Track,
+        seek_time: int = 0,
+        stats: bool = True,
+    ) -> None:
+        client = await db.get_assistant(chat_id)
+        if not media.file_path:
+            return await message.edit_text(f"File tidak ditemukan. Hubungi <a href='tg://user?id={config.OWNER_ID}'>owner</a>", parse_mode=enums.ParseMode.HTML)
+
         try:
-            await client.play(
-                chat_id=chat_id,
-                stream=stream,
-                config=types.GroupCallConfig(auto_start=False),
-            )
+            with self.timings.measure("play"):
+                await client.play(
+                    chat_id=chat_id,
+                    stream=self.stream(media, seek_time),
+                    config=types.GroupCallConfig(auto_start=False),
+                )
+            clock.start(chat_id, seek_time)
+            prefetch.schedule(chat_id)
             if not seek_time:
-                media.time = 1
                 await db.add_call(chat_id)
-                
-                # Track stats
-                try:
-                    stream_type = "file"
-                    if isinstance(media, Track):
-                        stream_type = "music"
-                        if media.duration in ["Unknown", "Live"] or "Stream" in media.duration:
-                             stream_type = "live"
-
-                    await db.add_stats(
-                        track_id=media.id,
-                        title=media.title,
-                        duration=media.duration,
-                        user_id=media.user_id or message.from_user.id,
-                        chat_id=chat_id,
-                        thumbnail=media.thumbnail if hasattr(media, 'thumbnail') else None,
-                        stream_type=stream_type
-                    )
-                    await db.increment_queries()
-                except:
-                    pass
-                
-                
-                # Enhanced now playing message
-                text = f"""🎵 <b>Sedang Memutar</b>
-
-<blockquote>🎧 <a href='{media.url}'>{media.title}</a>
-
-⏱ <b>Durasi:</b> {media.duration}
-👤 <b>Diminta oleh:</b> {media.user}</blockquote>"""
-                keyboard = buttons.controls(chat_id)
-                try:
-                    await message.edit_media(
-                        media=InputMediaPhoto(
-                            media=_thumb,
-                            caption=text,
-                        ),
-                        reply_markup=keyboard,
-                    )
-                except MessageIdInvalid:
-                    media.message_id = (await app.send_photo(
-                        chat_id=chat_id,
-                        photo=_thumb,
-                        caption=text,
-                        reply_markup=keyboard,
-                    )).id
+                # The stream is already running; the rest only updates the chat.
+                task = asyncio.create_task(self.now_playing(chat_id, message, media, stats))
+                self.background.add(task)
+                task.add_done_callback(self.background.discard)
         except FileNotFoundError:
             await message.edit_text(f"File tidak ditemukan. Hubungi <a href='tg://user?id={config.OWNER_ID}'>owner</a>", parse_mode=enums.ParseMode.HTML)
             await self.play_next(chat_id)
@@ -163,6 +149,70 @@ class TgCall(PyTgCalls):
             await message.edit_text("Format streaming RTMP tidak didukung.")
 
 
+    async def now_playing(self, chat_id: int, message: Message, media: Media | Track, stats: bool = True) -> None:
+        """Record stats and show the now playing card of a track that just started."""
+        # Runs as a background task, nothing else would see its errors
+        with self.timings.measure("now_playing"):
+            try:
+                await self._now_playing(chat_id, message, media, stats)
+            except Exception as e:
+                logger.warning(f"Failed to update now playing in {chat_id}: {e}")
+
+    async def _now_playing(self, chat_id: int, message: Message, media: Media | Track, stats: bool) -> None:
+        # Track stats
+        if stats:
+            try:
+                stream_type = "file"
+                if isinstance(media, Track):
+                    stream_type = "music"
+                    if media.duration in ["Unknown", "Live"] or "Stream" in media.duration:
+                         stream_type = "live"
+
+                await db.add_stats(
+                    track_id=media.id,
+                    title=media.title,
+                    duration=media.duration,
+                    user_id=media.user_id or message.from_user.id,
+                    chat_id=chat_id,
+                    thumbnail=media.thumbnail if hasattr(media, 'thumbnail') else None,
+                    stream_type=stream_type,
+                    duration_sec=media.duration_sec,
+                )
+                await db.increment_queries()
+            except:
+                pass
+
+        _thumb = (
+            await thumb.generate(media)
+            if isinstance(media, Track)
+            else config.DEFAULT_THUMB
+        )
+
+        # Enhanced now playing message
+        text = f"""🎵 <b>Sedang Memutar</b>
+
+<blockquote>🎧 <a href='{media.url}'>{media.title}</a>
+
+⏱ <b>Durasi:</b> {media.duration}
+👤 <b>Diminta oleh:</b> {media.user}</blockquote>"""
+        keyboard = buttons.controls(chat_id)
+        try:
+            await message.edit_media(
+                media=InputMediaPhoto(
+                    media=_thumb,
+                    caption=text,
+                ),
+                reply_markup=keyboard,
+            )
+        except MessageIdInvalid:
+            media.message_id = (await app.send_photo(
+                chat_id=chat_id,
+                photo=_thumb,
+                caption=text,
+                reply_markup=keyboard,
+            )).id
+
+
     async def replay(self, chat_id: int) -> None:
         if not await db.get_call(chat_id):
             return
@@ -172,21 +222,45 @@ class TgCall(PyTgCalls):
         await self.play_media(chat_id, msg, media)
 
 
-    async def play_next(self, chat_id: int) -> None:
-        if not await db.get_call(chat_id):
+    @staticmethod
+    async def _delete(chat_id: int, message_id: int) -> None:
+        if not message_id:
             return
+        try:
+            await app.delete_messages(chat_id=chat_id, message_ids=message_id, revoke=True)
+        except:
+            pass
 
-        old_media = queue.get_current(chat_id)
-        if old_media and old_media.message_id:
+
+    async def _announce(self, chat_id: int, media: Media | Track) -> Message:
+        msg_text = "Memutar lagu selanjutnya..."
+        if media.user_id:
             try:
-                await app.delete_messages(chat_id, old_media.message_id)
+                user = await app.get_users(media.user_id)
+                msg_text += f"\nRequest dari: {user.mention}"
             except:
                 pass
+        return await app.send_message(chat_id=chat_id, text=msg_text)
+
+
+    async def _fetch(self, chat_id: int, media: Media | Track) -> None:
+        # Joins (and speeds up) the prefetch download of the track, if any
+        with self.timings.measure("fetch"):
+            if not media.file_path and isinstance(media, Track):
+                media.file_path = await yt.download(media.id, video=media.video, priority=scheduler.NOW)
+
+
+    async def play_next(self, chat_id: int) -> None:
+        if not await db.get_call(chat_id):
+            return
 
+        started = monotonic()
+        old_media = queue.get_current(chat_id)
+        loop_mode, _ = await asyncio.gather(
+            db.get_loop_mode(chat_id),
+            self._delete(chat_id, old_media.message_id if old_media else 0),
+        )
 
-        # Check loop mode
-        loop_mode = await db.get_loop_mode(chat_id)
-        
         if loop_mode == "loop_one":
             # Replay current track
             if old_media:
@@ -198,41 +272,44 @@ class TgCall(PyTgCalls):
             if old_media:
                 queue.add(chat_id, old_media)
 
-        media = queue.get_next(chat_id)
-        try:
-            if media.message_id:
-                await app.delete_messages(
-                    chat_id=chat_id,
-                    message_ids=media.message_id,
-                    revoke=True,
-                )
-                media.message_id = 0
-        except:
-            pass
+        with self.timings.measure("resolve"):
+            media = queue.get_next(chat_id)
+            while isinstance(media, LazyTrack):
+                # An entry that can no longer be resolved is skipped
+                media = await self.resolve(chat_id, media) or queue.get_next(chat_id)
 
         if not media:
             return await self.stop(chat_id)
 
-        msg_text = "Memutar lagu selanjutnya..."
-        if media.user_id:
-            try:
-                user = await app.get_users(media.user_id)
-                msg_text += f"\nRequest dari: {user.mention}"
-            except:
-                pass
-
-        msg = await app.send_message(chat_id=chat_id, text=msg_text)
+        # The notice and the download do not depend on each other.
+        stale, media.message_id = media.message_id, 0
+        msg, _, _ = await asyncio.gather(
+            self._announce(chat_id, media),
+            self._fetch(chat_id, media),
+            self._delete(chat_id, stale),
+        )
         if not media.file_path:
-            media.file_path = await yt.download(media.id, video=media.video)
-            if not media.file_path:
-                await self.stop(chat_id)
-                return await msg.edit_text(
-                    f"File tidak ditemukan. Hubungi <a href='tg://user?id={config.OWNER_ID}'>owner</a>",
-                    parse_mode=enums.ParseMode.HTML
-                )
+            await self.stop(chat_id)
+            return await msg.edit_text(
+                f"File tidak ditemukan. Hubungi <a href='tg://user?id={config.OWNER_ID}'>owner</a>",
+                parse_mode=enums.ParseMode.HTML
+            )
 
         media.message_id = msg.id
         await self.play_media(chat_id, msg, media)
+        self.timings.record("transition", monotonic() - started)
+
+
+    async def load(self) -> dict[int, tuple[int, float]]:
+        """Return the active call count and ping of every assistant, by number."""
+        load = {}
+        for num, client in enumerate(self.clients, start=1):
+            try:
+                calls = len(await client.calls)
+            except Exception:
+                calls = 0
+            load[num] = (calls, client.ping)
+        return load
 
 
     async def ping(self) -> float:
@@ -257,6 +334,17 @@ class TgCall(PyTgCalls):
                         await self.stop(update.chat_id)
 
 
+    async def live_calls(self) -> set[int]:
+        """Return the chats where an assistant is actually in a call."""
+        live = set()
+        for client in self.clients:
+            try:
+                live.update((await client.calls).keys())
+            except Exception as e:
+                logger.warning(f"Failed to list active calls: {e}")
+        return live
+
+
     async def boot(self) -> None:
         PyTgCallsSession.notice_displayed = True
         for ub in userbot.clients:
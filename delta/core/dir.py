@@ -18,4 +18,8 @@ def ensure_dirs():
 
     for dir in ["cache", "downloads"]:
         Path(dir).mkdir(parents=True, exist_ok=True)
+
+    # Partial downloads of a previous run are never resumed
+    shutil.rmtree("downloads/tmp", ignore_errors=True)
+    Path("downloads/tmp").mkdir()
     logger.info("Cache directories updated.")
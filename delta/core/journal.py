@@ -0,0 +1,186 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+
+import asyncio
+import os
+from time import time
+
+from delta import app, clock, db, logger, queue, scheduler, yt
+from delta.helpers import LazyTrack, Media, Track
+
+TYPES = {"track": Track, "media": Media, "lazy": LazyTrack}
+
+
+class QueueJournal:
+    """
+    Persists every chat's queue and playback position to MongoDB.
+
+    Chats whose queue changed are written on the next tick and the position
+    of every playing chat is refreshed; both go through the write buffer,
+    so a tick costs at most one bulk write. Played items are only skipped
+    by moving ``offset``, and appended or resolved items are set by their
+    index; other changes (and an offset past half the items) rewrite the
+    whole queue. On boot the queues are rebuilt and the current track
+    resumes at its recorded position.
+    """
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.queuesdb = db.db.queues
+        # chat_id -> (offset, stored items, [(node key, item)] from offset on)
+        self.saved: dict[int, tuple[int, int, list]] = {}
+
+    @staticmethod
+    def dump(item: Media | Track | LazyTrack) -> dict:
+        """Serialize a queue item, leaving out empty and per-process fields."""
+        data = {"type": next(name for name, cls in TYPES.items() if isinstance(item, cls))}
+        for name, value in item.to_dict().items():
+            if value not in (None, "", 0, False) and name != "message_id":
+                data[name] = value
+        return data
+
+    @staticmethod
+    def load(data: dict) -> Media | Track | LazyTrack | None:
+        cls = TYPES.get(data.get("type")) if isinstance(data, dict) else None
+        if not cls:
+            return None
+        try:
+            item = cls(**{name: data[name] for name in cls.FIELDS if name in data})
+        except TypeError:
+            return None
+        # Remote streams (e.g. drama episodes) play straight from their URL
+        if item.file_path and "://" not in item.file_path and not os.path.exists(item.file_path):
+            item.file_path = None
+        return item
+
+    def _changes(self, chat_id: int, nodes: list) -> dict | None:
+        """Return the fields to ``$set`` for a queue, or None to rewrite it."""
+        if chat_id not in self.saved:
+            return None
+        offset, length, live = self.saved[chat_id]
+        keys = {key for key, _ in nodes}
+        played = 0
+        while played < len(live) and live[played][0] not in keys:
+            played += 1
+        kept = len(live) - played
+        if kept > len(nodes):
+            return None
+
+        fields = {}
+        for i, ((key, item), (old_key, old)) in enumerate(zip(nodes, live[played:])):
+            if key != old_key:
+                return None
+            if item is not old:
+                fields[f"items.{offset + played + i}"] = self.dump(item)
+        for i, (_, item) in enumerate(nodes[kept:]):
+            fields[f"items.{length + i}"] = self.dump(item)
+        offset, length = offset + played, length + len(nodes) - kept
+        if offset > length // 2:
+            return None
+        fields["offset"] = offset
+        self.saved[chat_id] = (offset, length, nodes)
+        return fields
+
+    def save(self) -> None:
+        """Queue the changes of changed queues and the positions of playing chats."""
+        dirty, queue.dirty = queue.dirty, set()
+        # Queues dropped for idling leave their documents for the next boot
+        for chat_id in [chat_id for chat_id in self.saved if not queue.size(chat_id)]:
+            if chat_id not in dirty:
+                del self.saved[chat_id]
+        for chat_id in dirty:
+            nodes = queue.get_nodes(chat_id)
+            if not nodes:
+                self.saved.pop(chat_id, None)
+                db.buffer.delete(self.queuesdb, chat_id)
+                continue
+            fields = self._changes(chat_id, nodes)
+            if fields is None:
+                self.saved[chat_id] = (0, len(nodes), nodes)
+                db.buffer.replace(self.queuesdb, chat_id, {
+                    "items": [self.dump(item) for _, item in nodes],
+                    "offset": 0,
+                    "position": clock.elapsed(chat_id) or 0,
+                    "saved": time(),
+                })
+                continue
+            db.buffer.set(self.queuesdb, chat_id, {
+                **fields,
+                "position": clock.elapsed(chat_id) or 0,
+                "saved": time(),
+            })
+
+        for chat_id in clock.chats():
+            if chat_id in dirty or not queue.get_current(chat_id):
+                continue
+            db.buffer.set(self.queuesdb, chat_id, {
+                "position": clock.elapsed(chat_id) or 0,
+                "saved": time(),
+            })
+
+    async def start(self) -> None:
+        """Snapshot every interval until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.save()
+            except Exception as e:
+                logger.warning(f"Queue journal snapshot failed: {e}")
+
+    async def restore(self, anon) -> None:
+        """Rebuild the saved queues and resume their current tracks."""
+        try:
+            await self._restore(anon)
+        except Exception as e:
+            logger.warning(f"Queue journal restore failed: {e}")
+
+    async def _restore(self, anon) -> None:
+        pending = []
+        async for doc in self.queuesdb.find():
+            chat_id = doc["_id"]
+            stored = doc.get("items", [])[doc.get("offset", 0):]
+            items = [item for item in map(self.load, stored) if item]
+            if items and isinstance(items[0], LazyTrack):
+                items[0] = await yt.resolve(items[0])
+            if not items or not items[0]:
+                await self.queuesdb.delete_one({"_id": chat_id})
+                continue
+
+            for item in items:
+                queue.add(chat_id, item)
+            queue.dirty.discard(chat_id)
+            pending.append(self._resume(anon, chat_id, items[0], int(doc.get("position", 0))))
+
+        results = await asyncio.gather(*pending)
+        if pending:
+            logger.info(f"Resumed {sum(results)}/{len(pending)} queue(s) from the journal.")
+
+    async def _resume(self, anon, chat_id: int, media: Media | Track, position: int) -> bool:
+        try:
+            await self._play(anon, chat_id, media, position)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to resume queue in {chat_id}: {e}")
+            queue.clear(chat_id)
+            await db.remove_call(chat_id)
+            return False
+
+    async def _play(self, anon, chat_id: int, media: Media | Track, position: int) -> None:
+        if not media.file_path:
+            if not isinstance(media, Track):
+                raise FileNotFoundError(media.id)
+            media.file_path = await yt.download(media.id, video=media.video, priority=scheduler.NOW)
+            if not media.file_path:
+                raise FileNotFoundError(media.id)
+
+        if media.duration_sec and position >= media.duration_sec - 1:
+            position = 0
+        msg = await app.send_message(chat_id=chat_id, text="Melanjutkan pemutaran...")
+        media.message_id = msg.id
+        if position:
+            # play_media only registers the call when it starts from the top
+            await db.add_call(chat_id)
+        # The play was already counted before the restart
+        await anon.play_media(chat_id, msg, media, seek_time=position, stats=False)
@@ -3,12 +3,17 @@
 # This file is part of AnonXMusic
 
 
-from random import randint
+import asyncio
+from datetime import datetime, timedelta
 from time import time
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 
-from delta import config, logger, userbot
+from delta import config, logger, tasks, userbot
+from delta.core.buffer import WriteBuffer
+from delta.core.rollups import Rollups
+from delta.helpers import BoundedCache, ChatSettings, IdSet, utils
 
 
 class MongoDB:
@@ -19,27 +24,28 @@ class MongoDB:
         self.mongo = AsyncIOMotorClient(config.MONGO_URL, serverSelectionTimeoutMS=12500)
         self.db = self.mongo[config.DB_NAME]
 
-        self.admin_list = {}
+        self.admin_list = BoundedCache(maxsize=5000, ttl=3600, name="admins")
+        self.active_calls = {}
         self.active_callsdb = self.db.active_calls
-        self.admin_play = []
-        self.blacklisted = []
-        self.cmd_delete = []
+        self.blacklisted = set()
         self.notified = []
         self.cache = self.db.cache
         self.logger = False
 
-        self.assistant = {}
+        self.assistant = BoundedCache(maxsize=20000, ttl=21600, name="assistants")
         self.assistantdb = self.db.assistant
 
-        self.auth = {}
+        self.auth = BoundedCache(maxsize=5000, ttl=3600, name="auth")
         self.authdb = self.db.auth
 
-        self.chats = []
+        self.chats = IdSet()
+        self.counts = {}
         self.chatsdb = self.db.chats
+        self.settings = BoundedCache(maxsize=5000, ttl=21600, name="settings")
 
 
 
-        self.users = []
+        self.users = IdSet()
         self.usersdb = self.db.users
 
         self.pm_warns = {}
@@ -50,8 +56,14 @@ class MongoDB:
 
         self.statsdb = self.db.stats
         self.queriesdb = self.db.queries
-        self.dailydb = self.db.daily_stats
-        self.hourlydb = self.db.hourly_stats
+        self.user_playsdb = self.db.user_plays
+        self.chat_playsdb = self.db.chat_plays
+        self.track_chatsdb = self.db.track_chats
+        self.track_usersdb = self.db.track_users
+        self.group_usersdb = self.db.group_users
+        self.platformsdb = self.db.platform_counts
+        self.buffer = WriteBuffer()
+        self.rollups = Rollups(self.db.rollups, self.cache, self.buffer)
 
     async def connect(self) -> None:
         """Check if we can connect to the database.
@@ -63,58 +75,87 @@ class MongoDB:
             start = time()
             await self.mongo.admin.command("ping")
             logger.info(f"Database connection successful. ({time() - start:.2f}s)")
+            await self.ensure_indexes()
             await self.load_cache()
+            tasks.append(asyncio.create_task(self.buffer.start()))
+            # Compaction starts once the old stats have been imported.
+            tasks.append(asyncio.create_task(self.migrate()))
         except Exception as e:
             raise SystemExit(f"Database connection failed: {type(e).__name__}") from e
 
+    async def ensure_indexes(self) -> None:
+        """Create the indexes the stats queries rely on."""
+        await self.user_playsdb.create_index([("count", -1)])
+        await self.chat_playsdb.create_index([("count", -1)])
+        await self.track_chatsdb.create_index([("chat", 1), ("count", -1), ("track", 1)])
+        await self.track_chatsdb.create_index([("track", 1), ("count", -1)])
+        await self.track_usersdb.create_index([("user", 1), ("count", -1), ("track", 1)])
+        await self.track_usersdb.create_index([("track", 1), ("count", -1)])
+        await self.group_usersdb.create_index([("chat", 1), ("count", -1), ("user", 1)])
+        await self.statsdb.create_index([("platform", 1)])
+        await self.statsdb.create_index([("is_live", 1), ("count", -1)])
+        await self.rollups.ensure_indexes()
+
     async def close(self) -> None:
-        """Close the connection to the database."""
+        """Flush buffered writes and close the connection to the database."""
+        await self.buffer.flush()
         await self.mongo.close()
         logger.info("Database connection closed.")
 
-    # CACHE
-    # CACHE
+    # CALL METHODS
+    # The in-memory registry is authoritative; Mongo is a write-behind mirror.
     async def get_call(self, chat_id: int) -> bool:
-        doc = await self.active_callsdb.find_one({"_id": chat_id})
-        return bool(doc)
+        return chat_id in self.active_calls
 
     async def add_call(self, chat_id: int) -> None:
-        await self.active_callsdb.update_one(
-            {"_id": chat_id},
-            {"$set": {"playing": 1}},
-            upsert=True
-        )
+        self.active_calls[chat_id] = 1
+        self.buffer.replace(self.active_callsdb, chat_id, {"playing": 1})
 
     async def remove_call(self, chat_id: int) -> None:
-        await self.active_callsdb.delete_one({"_id": chat_id})
+        self.active_calls.pop(chat_id, None)
+        self.buffer.delete(self.active_callsdb, chat_id)
 
     async def playing(self, chat_id: int, paused: bool = None) -> bool | None:
-        if paused is not None:
-            await self.active_callsdb.update_one(
-                {"_id": chat_id},
-                {"$set": {"playing": int(not paused)}},
-                upsert=True
+        if paused is not None and chat_id in self.active_calls:
+            self.active_calls[chat_id] = int(not paused)
+            self.buffer.replace(
+                self.active_callsdb, chat_id, {"playing": int(not paused)}
             )
-        doc = await self.active_callsdb.find_one({"_id": chat_id})
-        return bool(doc and doc.get("playing"))
+        return bool(self.active_calls.get(chat_id))
 
     async def get_active_calls(self) -> list:
         """Get list of active chat IDs."""
-        return [doc["_id"] async for doc in self.active_callsdb.find()]
+        return list(self.active_calls)
+
+    async def reconcile_calls(self, live: set[int]) -> None:
+        """Rebuild the call registry, dropping records of calls that are not live."""
+        stale = []
+        async for doc in self.active_callsdb.find():
+            if doc["_id"] in live:
+                self.active_calls[doc["_id"]] = doc.get("playing", 1)
+            else:
+                stale.append(doc["_id"])
+        if stale:
+            await self.active_callsdb.delete_many({"_id": {"$in": stale}})
+            logger.info(f"Dropped {len(stale)} stale active call(s).")
 
     async def get_admins(self, chat_id: int, reload: bool = False) -> list[int]:
         from delta.helpers._admins import reload_admins
 
-        if chat_id not in self.admin_list or reload:
-            self.admin_list[chat_id] = await reload_admins(chat_id)
-        return self.admin_list[chat_id]
+        admins = None if reload else self.admin_list.get(chat_id)
+        if admins is None:
+            admins = await reload_admins(chat_id)
+            self.admin_list[chat_id] = admins
+        return admins
 
     # AUTH METHODS
     async def _get_auth(self, chat_id: int) -> set[int]:
-        if chat_id not in self.auth:
+        users = self.auth.get(chat_id)
+        if users is None:
             doc = await self.authdb.find_one({"_id": chat_id}) or {}
-            self.auth[chat_id] = set(doc.get("user_ids", []))
-        return self.auth[chat_id]
+            users = set(doc.get("user_ids", []))
+            self.auth[chat_id] = users
+        return users
 
     async def is_auth(self, chat_id: int, user_id: int) -> bool:
         return user_id in await self._get_auth(chat_id)
@@ -136,8 +177,21 @@ class MongoDB:
             )
 
     # ASSISTANT METHODS
-    async def set_assistant(self, chat_id: int) -> int:
-        num = randint(1, len(userbot.clients))
+    @staticmethod
+    def _least_loaded(load: dict[int, tuple[int, float]]) -> int:
+        """Pick the assistant with the fewest calls (then lowest ping) that has room."""
+        cap = config.ASSISTANT_CAPACITY
+        free = [num for num, (calls, _) in load.items() if not cap or calls < cap]
+        if not free:
+            logger.warning(f"All assistants are at capacity ({cap} calls).")
+        return min(free or load, key=lambda num: load[num])
+
+    async def set_assistant(self, chat_id: int, num: int = None) -> int:
+        if num is None:
+            from delta import anon
+
+            load = await anon.load()
+            num = self._least_loaded(load) if load else 1
         await self.assistantdb.update_one(
             {"_id": chat_id},
             {"$set": {"num": num}},
@@ -149,24 +203,46 @@ class MongoDB:
     async def get_assistant(self, chat_id: int):
         from delta import anon
 
-        if chat_id not in self.assistant:
+        num = self.assistant.get(chat_id)
+        if num is None:
             doc = await self.assistantdb.find_one({"_id": chat_id})
-            num = doc["num"] if doc else await self.set_assistant(chat_id)
-            self.assistant[chat_id] = num
+            num = doc["num"] if doc else None
+        if not num or num > len(anon.clients):
+            num = await self.set_assistant(chat_id)
+        self.assistant[chat_id] = num
+
+        return anon.clients[num - 1]
 
-        return anon.clients[self.assistant[chat_id] - 1]
+    async def rebalance(self, chat_id: int) -> None:
+        """
+        Move a chat that is about to start a call to a less busy assistant.
+
+        The chat keeps its assistant unless that one is full or has at least
+        two calls more than the least loaded one, so a chat is not moved (and
+        its new assistant invited) over a difference of one call.
+        """
+        from delta import anon
+
+        await self.get_assistant(chat_id)
+        load = await anon.load()
+        if len(load) < 2:
+            return
+        current = self.assistant[chat_id]
+        best = self._least_loaded(load)
+        calls = load[current][0]
+        cap = config.ASSISTANT_CAPACITY
+        if best != current and ((cap and calls >= cap) or calls - load[best][0] >= 2):
+            await self.set_assistant(chat_id, best)
+            logger.info(f"Moved {chat_id} from assistant {current} to {best}.")
 
     async def get_client(self, chat_id: int):
-        if chat_id not in self.assistant:
-            await self.get_assistant(chat_id)
-        return {1: userbot.one, 2: userbot.two, 3: userbot.three}.get(
-            self.assistant[chat_id]
-        )
+        await self.get_assistant(chat_id)
+        return userbot.clients[self.assistant[chat_id] - 1]
 
     # BLACKLIST METHODS
     async def add_blacklist(self, chat_id: int) -> None:
         if str(chat_id).startswith("-"):
-            self.blacklisted.append(chat_id)
+            self.blacklisted.add(chat_id)
             return await self.cache.update_one(
                 {"_id": "bl_chats"}, {"$addToSet": {"chat_ids": chat_id}}, upsert=True
             )
@@ -176,7 +252,7 @@ class MongoDB:
 
     async def del_blacklist(self, chat_id: int) -> None:
         if str(chat_id).startswith("-"):
-            self.blacklisted.remove(chat_id)
+            self.blacklisted.discard(chat_id)
             return await self.cache.update_one(
                 {"_id": "bl_chats"},
                 {"$pull": {"chat_ids": chat_id}},
@@ -190,8 +266,8 @@ class MongoDB:
         if chat:
             if not self.blacklisted:
                 doc = await self.cache.find_one({"_id": "bl_chats"})
-                self.blacklisted.extend(doc.get("chat_ids", []) if doc else [])
-            return self.blacklisted
+                self.blacklisted.update(doc.get("chat_ids", []) if doc else [])
+            return list(self.blacklisted)
         doc = await self.cache.find_one({"_id": "bl_users"})
         return doc.get("user_ids", []) if doc else []
 
@@ -200,40 +276,72 @@ class MongoDB:
         return chat_id in self.chats
 
     async def add_chat(self, chat_id: int) -> None:
-        if not await self.is_chat(chat_id):
-            self.chats.append(chat_id)
-            await self.chatsdb.insert_one({"_id": chat_id})
+        if self.chats.add(chat_id):
+            self.buffer.insert(self.chatsdb, chat_id)
 
     async def rm_chat(self, chat_id: int) -> None:
-        if await self.is_chat(chat_id):
-            self.chats.remove(chat_id)
-            await self.chatsdb.delete_one({"_id": chat_id})
+        if self.chats.discard(chat_id):
+            self.buffer.delete(self.chatsdb, chat_id)
+            self.settings.pop(chat_id)
 
     async def get_chats(self) -> list:
         if not self.chats:
-            self.chats.extend([chat["_id"] async for chat in self.chatsdb.find()])
-        return self.chats
+            # Legacy documents may still carry ObjectId keys
+            cursor = self.chatsdb.find({"_id": {"$type": "number"}}, {"_id": 1})
+            self.chats = IdSet([chat["_id"] async for chat in cursor])
+        return list(self.chats)
+
+    async def count_chats(self) -> int:
+        return await self._count(self.chatsdb)
+
+    async def iter_chats(self):
+        """Stream chat ids from the database without loading them all."""
+        async for chat_id in self._iter_ids(self.chatsdb):
+            yield chat_id
+
+    @staticmethod
+    async def _iter_ids(collection, batch: int = 500):
+        # One short query per page instead of one long-lived cursor: slow
+        # consumers (broadcasts) would outlive the server's idle cursor timeout.
+        query = {"_id": {"$type": "number"}}
+        while True:
+            docs = await collection.find(query, {"_id": 1}).sort("_id", 1).limit(batch).to_list(batch)
+            for doc in docs:
+                yield doc["_id"]
+            if len(docs) < batch:
+                return
+            query = {"_id": {"$type": "number", "$gt": docs[-1]["_id"]}}
+
+    async def _count(self, collection, ttl: int = 60) -> int:
+        """Return the collection's estimated document count, cached for ``ttl`` seconds."""
+        count, expires = self.counts.get(collection.name, (0, 0))
+        if expires < time():
+            count = await collection.estimated_document_count()
+            self.counts[collection.name] = (count, time() + ttl)
+        return count
+
+    # CHAT SETTINGS METHODS
+    async def get_settings(self, chat_id: int) -> ChatSettings:
+        """Get all settings of a chat, loading its document once and caching it."""
+        settings = self.settings.get(chat_id)
+        if settings is None:
+            doc = await self.chatsdb.find_one({"_id": chat_id})
+            # Settings changed or removed shortly before may not be flushed yet
+            settings = ChatSettings.from_doc(self.buffer.view(self.chatsdb, chat_id, doc) or {})
+            self.settings.set(chat_id, settings)
+        return settings
+
+    async def _set_setting(self, chat_id: int, key: str, value) -> None:
+        setattr(await self.get_settings(chat_id), key, value)
+        # Buffered like add_chat/rm_chat, so the three are applied in order
+        self.buffer.set(self.chatsdb, chat_id, {key: value})
 
     # COMMAND DELETE
     async def get_cmd_delete(self, chat_id: int) -> bool:
-        if chat_id not in self.cmd_delete:
-            doc = await self.chatsdb.find_one({"_id": chat_id})
-            if doc and doc.get("cmd_delete"):
-                self.cmd_delete.append(chat_id)
-        return chat_id in self.cmd_delete
+        return (await self.get_settings(chat_id)).cmd_delete
 
     async def set_cmd_delete(self, chat_id: int, delete: bool = False) -> None:
-        if delete:
-            self.cmd_delete.append(chat_id)
-        else:
-            self.cmd_delete.remove(chat_id)
-        await self.chatsdb.update_one(
-            {"_id": chat_id},
-            {"$set": {"cmd_delete": delete}},
-            upsert=True,
-        )
-
-
+        await self._set_setting(chat_id, "cmd_delete", delete)
 
     # LOGGER METHODS
     async def is_logger(self) -> bool:
@@ -255,86 +363,46 @@ class MongoDB:
 
     # PLAY MODE METHODS
     async def get_play_mode(self, chat_id: int) -> bool:
-        if chat_id not in self.admin_play:
-            doc = await self.chatsdb.find_one({"_id": chat_id})
-            if doc and doc.get("admin_play"):
-                self.admin_play.append(chat_id)
-        return chat_id in self.admin_play
+        return (await self.get_settings(chat_id)).admin_play
 
     async def set_play_mode(self, chat_id: int, remove: bool = False) -> None:
-        if remove and chat_id in self.admin_play:
-            self.admin_play.remove(chat_id)
-        else:
-            self.admin_play.append(chat_id)
-        await self.chatsdb.update_one(
-            {"_id": chat_id},
-            {"$set": {"admin_play": not remove}},
-            upsert=True,
-        )
+        await self._set_setting(chat_id, "admin_play", not remove)
 
     # LOOP MODE METHODS
     async def get_loop_mode(self, chat_id: int) -> str:
         """Get loop mode for a chat. Returns 'normal', 'loop_all', or 'loop_one'."""
-        doc = await self.chatsdb.find_one({"_id": chat_id})
-        if doc and "loop_mode" in doc:
-            return doc["loop_mode"]
-        return "normal"
+        return (await self.get_settings(chat_id)).loop_mode
 
     async def set_loop_mode(self, chat_id: int, mode: str) -> None:
         """Set loop mode for a chat. Mode should be 'normal', 'loop_all', or 'loop_one'."""
-        await self.chatsdb.update_one(
-            {"_id": chat_id},
-            {"$set": {"loop_mode": mode}},
-            upsert=True,
-        )
+        await self._set_setting(chat_id, "loop_mode", mode)
 
     # VIDEO MODE METHODS
     async def get_video_mode(self, chat_id: int) -> bool:
         """Get video mode for a chat. Returns True if video enabled, False for audio only."""
-        doc = await self.chatsdb.find_one({"_id": chat_id})
-        if doc and "video_mode" in doc:
-            return doc["video_mode"]
-        return True  # Default: video enabled
+        return (await self.get_settings(chat_id)).video_mode
 
     async def set_video_mode(self, chat_id: int, enabled: bool) -> None:
         """Set video mode for a chat."""
-        await self.chatsdb.update_one(
-            {"_id": chat_id},
-            {"$set": {"video_mode": enabled}},
-            upsert=True,
-        )
+        await self._set_setting(chat_id, "video_mode", enabled)
 
     # VIDEO QUALITY METHODS
     async def get_video_quality(self, chat_id: int) -> str:
         """Get video quality for a chat. Returns '360p', '480p', '720p', or '1080p'."""
-        doc = await self.chatsdb.find_one({"_id": chat_id})
-        if doc and "video_quality" in doc:
-            return doc["video_quality"]
-        return "720p"  # Default quality
+        return (await self.get_settings(chat_id)).video_quality
 
     async def set_video_quality(self, chat_id: int, quality: str) -> None:
         """Set video quality for a chat."""
-        await self.chatsdb.update_one(
-            {"_id": chat_id},
-            {"$set": {"video_quality": quality}},
-            upsert=True,
-        )
+        await self._set_setting(chat_id, "video_quality", quality)
 
     # DRAMA MODE METHODS
     async def get_drama_mode(self, chat_id: int) -> bool:
         """Get drama mode for a chat. Returns True if admin only, False if everyone."""
-        doc = await self.chatsdb.find_one({"_id": chat_id})
-        if doc and "drama_mode" in doc:
-            return doc["drama_mode"]
-        return True  # Default: admin only
+        return (await self.get_settings(chat_id)).drama_mode
 
     async def set_drama_mode(self, chat_id: int, admin_only: bool) -> None:
         """Set drama mode for a chat."""
-        await self.chatsdb.update_one(
-            {"_id": chat_id},
-            {"$set": {"drama_mode": admin_only}},
-            upsert=True,
-        )
+        await self._set_setting(chat_id, "drama_mode", admin_only)
 
     # SUDO METHODS
     async def add_sudo(self, user_id: int) -> None:
@@ -356,19 +424,26 @@ class MongoDB:
         return user_id in self.users
 
     async def add_user(self, user_id: int) -> None:
-        if not await self.is_user(user_id):
-            self.users.append(user_id)
-            await self.usersdb.insert_one({"_id": user_id})
+        if self.users.add(user_id):
+            self.buffer.insert(self.usersdb, user_id)
 
     async def rm_user(self, user_id: int) -> None:
-        if await self.is_user(user_id):
-            self.users.remove(user_id)
-            await self.usersdb.delete_one({"_id": user_id})
+        if self.users.discard(user_id):
+            self.buffer.delete(self.usersdb, user_id)
 
     async def get_users(self) -> list:
         if not self.users:
-            self.users.extend([user["_id"] async for user in self.usersdb.find()])
-        return self.users
+            cursor = self.usersdb.find({"_id": {"$type": "number"}}, {"_id": 1})
+            self.users = IdSet([user["_id"] async for user in cursor])
+        return list(self.users)
+
+    async def count_users(self) -> int:
+        return await self._count(self.usersdb)
+
+    async def iter_users(self):
+        """Stream user ids from the database without loading them all."""
+        async for user_id in self._iter_ids(self.usersdb):
+            yield user_id
 
     # PM WARNINGS METHODS
     async def get_pm_warns(self, user_id: int) -> int:
@@ -439,62 +514,47 @@ class MongoDB:
         await self.pm_messagesdb.delete_one({"_id": "custom_messages"})
 
     # STATS TRACKING METHODS
-    async def add_stats(self, track_id: str, title: str, duration: str, user_id: int, chat_id: int, thumbnail: str = None, stream_type: str = "music") -> None:
-        """Add or update play statistics."""
+    async def add_stats(self, track_id: str, title: str, duration: str, user_id: int, chat_id: int, thumbnail: str = None, stream_type: str = "music", duration_sec: int = 0) -> None:
+        """Queue play statistics; they reach the database on the next buffer flush."""
         update_data = {
             "title": title, 
             "duration": duration,
-            "stream_type": stream_type
+            "duration_sec": duration_sec or 0,
+            "is_live": stream_type == "live",
+            "stream_type": stream_type,
+            "platform": self.get_platform(track_id),
         }
         if thumbnail:
             update_data["thumbnail"] = thumbnail
 
-        await self.statsdb.update_one(
-            {"_id": track_id},
-            {
-                "$set": update_data,
-                "$inc": {
-                    "count": 1,
-                    f"users.{user_id}": 1,
-                    f"chats.{chat_id}": 1
-                }
-            },
-            upsert=True
+        self.buffer.inc(self.statsdb, track_id, {"count": 1}, update_data)
+        self.buffer.inc(self.platformsdb, update_data["platform"], {"count": 1})
+
+        # Add to the (track, chat), (track, user) and (chat, user) edges
+        self.buffer.inc(
+            self.track_chatsdb, f"{chat_id}:{track_id}", {"count": 1},
+            {"track": track_id, "chat": chat_id},
         )
-        
-        # Add to group-specific user stats
-        await self.db.group_stats.update_one(
-            {"_id": chat_id},
-            {"$inc": {f"users.{user_id}": 1}},
-            upsert=True
+        self.buffer.inc(
+            self.track_usersdb, f"{user_id}:{track_id}", {"count": 1},
+            {"track": track_id, "user": user_id},
         )
-
-        # Add to daily stats
-        from datetime import datetime
-        today = datetime.now().strftime("%Y-%m-%d")
-        await self.dailydb.update_one(
-            {"_id": today},
-            {"$inc": {"count": 1}},
-            upsert=True
+        self.buffer.inc(
+            self.group_usersdb, f"{chat_id}:{user_id}", {"count": 1},
+            {"chat": chat_id, "user": user_id},
         )
 
-        # Add to hourly stats (Peak Hours)
-        current_hour = datetime.now().hour # 0-23
-        await self.hourlydb.update_one(
-            {"_id": today},
-            {"$inc": {f"hours.{current_hour}": 1}},
-            upsert=True
-        )
+        # Add to the global user and chat leaderboards
+        self.buffer.inc(self.user_playsdb, user_id, {"count": 1})
+        self.buffer.inc(self.chat_playsdb, chat_id, {"count": 1})
+
+        # Add to the time-series rollups (daily, peak hours, windowed tops)
+        self.rollups.record(track_id)
 
     async def get_global_tops(self, limit: int = 10) -> dict:
         """Get top tracks globally."""
         # Filter out Live streams and Unknown duration
-        query = {
-            "duration": {
-                "$nin": ["Live", "Unknown"],
-                "$not": {"$regex": "^Stream|Live$", "$options": "i"}
-            },
-        }
+        query = {"is_live": False, "duration_sec": {"$gt": 0}}
         cursor = self.statsdb.find(query).sort("count", -1).limit(limit)
         results = {}
         async for doc in cursor:
@@ -508,164 +568,210 @@ class MongoDB:
 
     async def get_top_users(self, limit: int = 10) -> dict:
         """Get most active users globally."""
-        pipeline = [
-            {"$project": {"users": {"$objectToArray": "$users"}}},
-            {"$unwind": "$users"},
-            {"$group": {"_id": "$users.k", "count": {"$sum": "$users.v"}}},
-            {"$sort": {"count": -1}},
-            {"$limit": limit}
-        ]
-        cursor = self.statsdb.aggregate(pipeline)
-        results = {}
-        async for doc in cursor:
-            try:
-                user_id = int(doc["_id"])
-                results[user_id] = doc["count"]
-            except (ValueError, TypeError):
-                continue
-        return results
+        cursor = self.user_playsdb.find().sort("count", -1).limit(limit)
+        return {doc["_id"]: doc["count"] async for doc in cursor}
 
     async def get_top_chats(self, limit: int = 10) -> dict:
         """Get most active groups globally."""
-        pipeline = [
-            {"$project": {"chats": {"$objectToArray": "$chats"}}},
-            {"$unwind": "$chats"},
-            {"$group": {"_id": "$chats.k", "count": {"$sum": "$chats.v"}}},
-            {"$sort": {"count": -1}},
-            {"$limit": limit}
-        ]
-        results = {}
-        cursor = self.statsdb.aggregate(pipeline)
-        docs = await cursor.to_list(length=None)
-        for doc in docs:
-            try:
-                chat_id = int(doc["_id"])
-                results[chat_id] = doc["count"]
-            except (ValueError, TypeError):
-                continue
-        return results
+        cursor = self.chat_playsdb.find().sort("count", -1).limit(limit)
+        return {doc["_id"]: doc["count"] async for doc in cursor}
+
+    async def get_chat_rank(self, chat_id: int) -> tuple[int, int] | None:
+        """Get a group's global rank and the number of ranked groups."""
+        doc = await self.chat_playsdb.find_one({"_id": chat_id})
+        if not doc:
+            return None
+        above = await self.chat_playsdb.count_documents({"count": {"$gt": doc["count"]}})
+        return above + 1, await self.chat_playsdb.estimated_document_count()
 
     async def get_group_stats(self, chat_id: int, limit: int = 10) -> dict:
         """Get top tracks for a specific group."""
         query = {
-            f"chats.{chat_id}": {"$exists": True},
-            "duration": {
-                "$nin": ["Live", "Unknown"],
-                "$not": {"$regex": "^Stream|Live$", "$options": "i"}
-            },
+            "is_live": False,
+            "duration_sec": {"$gt": 0},
             "thumbnail": {"$exists": True, "$ne": None}
         }
-        cursor = self.statsdb.find(query).sort(f"chats.{chat_id}", -1).limit(limit)
-        results = {}
-        async for doc in cursor:
-            chats = doc.get("chats", {})
-            count = chats.get(str(chat_id), 0)
-            if count > 0:
+        # Walk the group's edges by play count, covered by (chat, count, track).
+        edges = self.track_chatsdb.find(
+            {"chat": chat_id}, {"_id": 0, "track": 1, "count": 1}
+        ).sort("count", -1).batch_size(max(limit * 2, 20))
+
+        results, batch = {}, []
+        async for edge in edges:
+            batch.append(edge)
+            if len(batch) < max(limit * 2, 20):
+                continue
+            await self._fill_group_tracks(results, batch, query, limit)
+            batch = []
+            if len(results) >= limit:
+                break
+        if batch and len(results) < limit:
+            await self._fill_group_tracks(results, batch, query, limit)
+        return results
+
+    async def _fill_group_tracks(self, results: dict, edges: list, query: dict, limit: int) -> None:
+        ids = [edge["track"] for edge in edges]
+        docs = {
+            doc["_id"]: doc
+            async for doc in self.statsdb.find(
+                {"_id": {"$in": ids}, **query},
+                {"title": 1, "duration": 1},
+            )
+        }
+        for edge in edges:
+            doc = docs.get(edge["track"])
+            if doc and edge["count"] > 0 and len(results) < limit:
                 results[doc["_id"]] = {
-                    "spot": count,
+                    "spot": edge["count"],
                     "title": doc.get("title", "Unknown"),
                     "duration": doc.get("duration", "0:00")
                 }
-        return results
 
     async def get_group_top_users(self, chat_id: int, limit: int = 10) -> dict:
         """Get top users for a specific group."""
-        doc = await self.db.group_stats.find_one({"_id": chat_id})
-        if not doc or "users" not in doc:
-            return {}
-        
-        users = doc["users"]
-        # Sort by count desc and take top limit
-        sorted_users = dict(sorted(users.items(), key=lambda item: item[1], reverse=True)[:limit])
-        return sorted_users
+        cursor = self.group_usersdb.find(
+            {"chat": chat_id}, {"_id": 0, "user": 1, "count": 1}
+        ).sort("count", -1).limit(limit)
+        return {doc["user"]: doc["count"] async for doc in cursor}
 
     async def increment_queries(self) -> None:
         """Increment total queries counter."""
-        await self.queriesdb.update_one(
-            {"_id": "total_queries"},
-            {"$inc": {"count": 1}},
-            upsert=True
-        )
+        self.buffer.inc(self.queriesdb, "total_queries", {"count": 1})
 
     async def get_queries(self) -> int:
-        """Get total queries count."""
+        """Get total queries count, including increments not yet flushed."""
         doc = await self.queriesdb.find_one({"_id": "total_queries"})
-        return doc.get("count", 0) if doc else 0
+        pending = self.buffer.peek(self.queriesdb, "total_queries", "count")
+        return (doc.get("count", 0) if doc else 0) + pending
 
     async def get_daily_play_count(self, days: int = 7) -> list:
         """Get daily play counts for the last N days."""
-        from datetime import datetime, timedelta
-        
-        results = []
-        today = datetime.now()
-        
-        for i in range(days):
-            date = (today - timedelta(days=i)).strftime("%Y-%m-%d")
-            doc = await self.dailydb.find_one({"_id": date})
-            count = doc.get("count", 0) if doc else 0
-            results.append({
-                "date": date,
-                "play_count": count
-            })
-            
-        return results[::-1]  # Return chronologically (oldest first)
+        now = datetime.now()
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+        counts = await self.rollups.series(start, now, "day")
+        return [
+            {
+                "date": f"{start + timedelta(days=i):%Y-%m-%d}",
+                "play_count": counts.get(start + timedelta(days=i), 0),
+            }
+            for i in range(days)
+        ]
 
     async def get_peak_hours(self, days: int = 7) -> list:
         """Get aggregated play counts per hour (0-23) for the last N days."""
-        from datetime import datetime, timedelta
-        
-        # Initialize 24 hours with 0
+        now = datetime.now()
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
         hourly_counts = [0] * 24
-        
-        today = datetime.now()
-        for i in range(days):
-            date = (today - timedelta(days=i)).strftime("%Y-%m-%d")
-            doc = await self.hourlydb.find_one({"_id": date})
-            if doc and "hours" in doc:
-                hours_data = doc["hours"]
-                for hour, count in hours_data.items():
-                    try:
-                        h = int(hour)
-                        if 0 <= h < 24:
-                            hourly_counts[h] += count
-                    except:
-                        pass
-        
+        for ts, count in (await self.rollups.series(start, now, "hour")).items():
+            hourly_counts[ts.hour] += count
         return hourly_counts
 
+    async def get_top_tracks(self, days: int = 7, limit: int = 10) -> dict:
+        """Get the most played tracks of the last N days."""
+        now = datetime.now()
+        tops = await self.rollups.top_tracks(now - timedelta(days=days), now, limit)
+        docs = {
+            doc["_id"]: doc
+            async for doc in self.statsdb.find(
+                {"_id": {"$in": [track_id for track_id, _ in tops]}},
+                {"title": 1, "duration": 1, "thumbnail": 1},
+            )
+        }
+        return {
+            track_id: {
+                "spot": count,
+                "title": docs.get(track_id, {}).get("title", "Unknown"),
+                "duration": docs.get(track_id, {}).get("duration", "0:00"),
+                "thumbnail": docs.get(track_id, {}).get("thumbnail"),
+            }
+            for track_id, count in tops
+        }
+
+    @staticmethod
+    def get_platform(track_id: str) -> str:
+        """Classify a track id as youtube, spotify, soundcloud, local or other."""
+        track_id_lower = track_id.lower()
+        if "spotify" in track_id_lower:
+            return "spotify"
+        if "soundcloud" in track_id_lower:
+            return "soundcloud"
+        if track_id.startswith("file://") or track_id.startswith("/"):
+            return "local"
+        # YouTube video IDs are 11 chars alphanumeric
+        if len(track_id) == 11 and track_id.isalnum():
+            return "youtube"
+        if "youtube" in track_id_lower or "youtu.be" in track_id_lower:
+            return "youtube"
+        return "other"
+
     async def get_platform_stats(self) -> dict:
         """Get distribution of platforms (YouTube, Spotify, SoundCloud, etc.)."""
         platforms = {"youtube": 0, "spotify": 0, "soundcloud": 0, "local": 0, "other": 0}
-        
-        # Aggregate from statsdb
-        cursor = self.statsdb.find({})
-        async for doc in cursor:
-            track_id = doc.get("_id", "")
-            count = doc.get("count", 0)
-            
-            # Platform detection logic
-            if not track_id:
-                continue
-            
-            track_id_lower = track_id.lower()
-            if "spotify" in track_id_lower or track_id.startswith("spotify:"):
-                platforms["spotify"] += count
-            elif "soundcloud" in track_id_lower:
-                platforms["soundcloud"] += count
-            elif track_id.startswith("file://") or track_id.startswith("/"):
-                platforms["local"] += count
-            elif len(track_id) == 11 and track_id.isalnum():
-                # YouTube video IDs are 11 chars alphanumeric
-                platforms["youtube"] += count
-            else:
-                # Check if it's a YouTube URL pattern
-                if "youtube" in track_id_lower or "youtu.be" in track_id_lower:
-                    platforms["youtube"] += count
-                else:
-                    platforms["other"] += count
-        
+        async for doc in self.platformsdb.find():
+            platforms[doc["_id"]] = doc.get("count", 0)
+        for platform in platforms:
+            platforms[platform] += self.buffer.peek(self.platformsdb, platform, "count")
         return platforms
 
+    async def migrate_platforms(self, batch_size: int = 1000) -> None:
+        """Tag every stats document with its platform and rebuild the counters."""
+        logger.info("Tagging stats documents with their platform...")
+        groups = {}
+        cursor = self.statsdb.find({"platform": {"$exists": False}}, {"_id": 1})
+        async for doc in cursor.batch_size(batch_size):
+            if not doc["_id"]:
+                continue
+            groups.setdefault(self.get_platform(str(doc["_id"])), []).append(doc["_id"])
+            if sum(len(ids) for ids in groups.values()) >= batch_size:
+                await self._tag_platforms(groups)
+                groups = {}
+        await self._tag_platforms(groups)
+
+        # With no flush running, pending plays are in neither collection yet
+        async with self.buffer.lock:
+            ops = [
+                UpdateOne({"_id": doc["_id"]}, {"$set": {"count": doc["count"]}}, upsert=True)
+                async for doc in self.statsdb.aggregate([
+                    {"$match": {"platform": {"$exists": True}}},
+                    {"$group": {"_id": "$platform", "count": {"$sum": "$count"}}},
+                ])
+            ]
+            if ops:
+                await self.platformsdb.bulk_write(ops, ordered=False)
+        logger.info("Platform counters rebuilt.")
+
+    async def migrate_durations(self, batch_size: int = 1000) -> None:
+        """Derive duration_sec and is_live from the duration string of old stats."""
+        logger.info("Backfilling duration_sec and is_live on stats documents...")
+        ops = []
+        cursor = self.statsdb.find(
+            {"is_live": {"$exists": False}}, {"duration": 1, "stream_type": 1}
+        ).batch_size(batch_size)
+        async for doc in cursor:
+            duration = str(doc.get("duration") or "")
+            is_live = doc.get("stream_type") == "live" or duration.lower() == "live" \
+                or duration.lower().startswith("stream") or duration.lower().endswith("live")
+            try:
+                duration_sec = utils.to_seconds(duration)
+            except ValueError:
+                duration_sec = 0
+            ops.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"duration_sec": duration_sec, "is_live": is_live}},
+            ))
+            if len(ops) >= batch_size:
+                await self.statsdb.bulk_write(ops, ordered=False)
+                ops = []
+        if ops:
+            await self.statsdb.bulk_write(ops, ordered=False)
+        logger.info("Stats durations backfilled.")
+
+    async def _tag_platforms(self, groups: dict) -> None:
+        for platform, ids in groups.items():
+            await self.statsdb.update_many(
+                {"_id": {"$in": ids}}, {"$set": {"platform": platform}}
+            )
+
     # USER PLAYLIST METHODS
     async def add_to_playlist(self, user_id: int, track_id: str, title: str, duration: str, url: str) -> bool:
         """Add a track to user's playlist. Returns True if added, False if already exists."""
@@ -710,57 +816,214 @@ class MongoDB:
         )
 
 
-    async def migrate_coll(self) -> None:
+    async def migrate_coll(self, batch_size: int = 1000) -> None:
+        """
+        Key the users and chats of the old layout by their Telegram id.
+
+        Missing documents are inserted before the old ones are removed, so an
+        interrupted run can simply be repeated.
+        """
         from bson import ObjectId
         logger.info("Migrating users and chats from old collections...")
 
-        musers, mchats, done = [], [], []
-        ulist = [user async for user in self.db.tgusersdb.find()]
-        ulist.extend([user async for user in self.usersdb.find()])
-
-        for user in ulist:
-            if isinstance(user.get("_id"), ObjectId):
-                user_id = int(user["user_id"])
-                if user_id in done:
-                    continue
-                done.append(user_id)
-                musers.append(user)
-            else:
-                user_id = int(user["_id"])
-                if user_id in done:
-                    continue
-                done.append(user_id)
-                musers.append({"_id": user_id})
-        await self.usersdb.drop()
+        for sources, target, key, cached in (
+            ((self.db.tgusersdb, self.usersdb), self.usersdb, "user_id", "users"),
+            ((self.chatsdb,), self.chatsdb, "chat_id", "chats"),
+        ):
+            for source in sources:
+                batch = set()
+                async for doc in source.find({}, {key: 1}).batch_size(batch_size):
+                    try:
+                        batch.add(int(doc[key] if isinstance(doc["_id"], ObjectId) else doc["_id"]))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    if len(batch) >= batch_size:
+                        await self._insert_ids(target, batch, cached)
+                        batch = set()
+                await self._insert_ids(target, batch, cached)
+            await target.delete_many({"_id": {"$not": {"$type": "number"}}})
         await self.db.tgusersdb.drop()
-        if musers:
-            await self.usersdb.insert_many(musers)
+        logger.info("Migration completed.")
 
-        async for chat in self.chatsdb.find():
-            if isinstance(chat.get("_id"), ObjectId):
-                chat_id = int(chat["chat_id"])
-                if chat_id in mchats:
-                    continue
-                done.append(chat_id)
-                mchats.append(chat)
-            else:
-                chat_id = int(chat["_id"])
-                if chat_id in done:
-                    continue
-                done.append(chat_id)
-                mchats.append({"_id": chat_id})
-        await self.chatsdb.drop()
-        if mchats:
-            await self.chatsdb.insert_many(mchats)
+    async def _insert_ids(self, collection, batch: set, cached: str) -> None:
+        if not batch:
+            return
+        cursor = collection.find({"_id": {"$in": list(batch)}}, {"_id": 1})
+        new = batch - {doc["_id"] async for doc in cursor}
+        if new:
+            await collection.insert_many([{"_id": _id} for _id in new])
+        ids = getattr(self, cached)
+        for _id in batch:
+            ids.add(_id)
+
+    async def _merge_legacy(self, name: str, stage, *collections) -> None:
+        """
+        Add counts migrated from old data to the live ``count`` of counters.
 
-        await self.cache.insert_one({"_id": "migrated"})
-        logger.info("Migration completed.")
+        ``stage`` writes the old counts into a ``legacy`` field, which can be
+        repeated; once it finished, every document adds ``legacy`` to its
+        ``count`` and drops it in one update. Plays counted meanwhile are
+        kept, and an interrupted run never adds a count twice.
+        """
+        if not await self.cache.find_one({"_id": f"staged_{name}"}):
+            await stage()
+            await self.cache.insert_one({"_id": f"staged_{name}"})
+        for collection in collections:
+            await collection.update_many({"legacy": {"$exists": True}}, [
+                {"$set": {"count": {"$add": [{"$ifNull": ["$count", 0]}, "$legacy"]}}},
+                {"$unset": "legacy"},
+            ])
+
+    async def migrate_leaderboards(self) -> None:
+        """Build the user and chat play counters from the per-track stats maps."""
+        logger.info("Building user and chat leaderboards from stats...")
+
+        async def _stage() -> None:
+            for field, target in (("users", self.user_playsdb), ("chats", self.chat_playsdb)):
+                await self.statsdb.aggregate([
+                    {"$project": {"items": {"$objectToArray": f"${field}"}}},
+                    {"$unwind": "$items"},
+                    {"$group": {"_id": "$items.k", "legacy": {"$sum": "$items.v"}}},
+                    {"$project": {
+                        "_id": {"$convert": {"input": "$_id", "to": "long", "onError": None}},
+                        "legacy": 1,
+                        "count": {"$literal": 0},
+                    }},
+                    {"$match": {"_id": {"$ne": None}}},
+                    {"$merge": {
+                        "into": target.name,
+                        "whenMatched": [{"$set": {"legacy": "$$new.legacy"}}],
+                        "whenNotMatched": "insert",
+                    }},
+                ]).to_list(length=None)
+
+        await self._merge_legacy("leaderboards", _stage, self.user_playsdb, self.chat_playsdb)
+        logger.info("Leaderboards built.")
+
+    async def migrate_stats_edges(self, batch_size: int = 500) -> None:
+        """
+        Move the users/chats maps of stats and group_stats documents into the
+        track_chats, track_users and group_users edge collections.
+        """
+        await self._merge_legacy(
+            "edges", lambda: self._stage_edges(batch_size),
+            self.track_chatsdb, self.track_usersdb, self.group_usersdb,
+        )
 
-    async def load_cache(self) -> None:
-        doc = await self.cache.find_one({"_id": "migrated"})
-        if not doc:
-            await self.migrate_coll()
+    async def _stage_edges(self, batch_size: int) -> None:
+        # Documents are streamed in batches; each batch's maps are unset
+        # right after its edges are written, so a rerun picks up the rest.
+        logger.info("Migrating stats maps to edge collections...")
+        done = skipped = 0
+        cursor = self.statsdb.find(
+            {"$or": [{"users": {"$exists": True}}, {"chats": {"$exists": True}}]},
+            {"users": 1, "chats": 1},
+        ).batch_size(batch_size)
+
+        def _ids(counts: dict):
+            # Old maps may hold keys such as "None" from plays without a user
+            nonlocal skipped
+            for key, count in (counts or {}).items():
+                try:
+                    yield int(key), count
+                except (TypeError, ValueError):
+                    skipped += 1
+
+        async def _write(docs: list) -> None:
+            chats, users = [], []
+            for doc in docs:
+                track_id = doc["_id"]
+                for chat_id, count in _ids(doc.get("chats")):
+                    chats.append(UpdateOne(
+                        {"_id": f"{chat_id}:{track_id}"},
+                        {"$set": {"track": track_id, "chat": chat_id, "legacy": count},
+                         "$setOnInsert": {"count": 0}},
+                        upsert=True,
+                    ))
+                for user_id, count in _ids(doc.get("users")):
+                    users.append(UpdateOne(
+                        {"_id": f"{user_id}:{track_id}"},
+                        {"$set": {"track": track_id, "user": user_id, "legacy": count},
+                         "$setOnInsert": {"count": 0}},
+                        upsert=True,
+                    ))
+            if chats:
+                await self.track_chatsdb.bulk_write(chats, ordered=False)
+            if users:
+                await self.track_usersdb.bulk_write(users, ordered=False)
+            await self.statsdb.update_many(
+                {"_id": {"$in": [doc["_id"] for doc in docs]}},
+                {"$unset": {"users": "", "chats": ""}},
+            )
+
+        batch = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                await _write(batch)
+                done += len(batch)
+                batch = []
+                logger.info(f"Migrated {done} stats documents...")
+        if batch:
+            await _write(batch)
+            done += len(batch)
+
+        ops = []
+        async for doc in self.db.group_stats.find().batch_size(batch_size):
+            for user_id, count in _ids(doc.get("users")):
+                ops.append(UpdateOne(
+                    {"_id": f"{doc['_id']}:{user_id}"},
+                    {"$set": {"chat": doc["_id"], "user": user_id, "legacy": count},
+                     "$setOnInsert": {"count": 0}},
+                    upsert=True,
+                ))
+            if len(ops) >= batch_size:
+                await self.group_usersdb.bulk_write(ops, ordered=False)
+                ops = []
+        if ops:
+            await self.group_usersdb.bulk_write(ops, ordered=False)
+        await self.db.group_stats.drop()
+
+        if skipped:
+            logger.warning(f"Skipped {skipped} stats map entries without a numeric id.")
+        logger.info(f"Stats edge migration completed ({done} tracks).")
+
+    async def migrate_rollups(self) -> None:
+        """Import the old daily_stats and hourly_stats into the rollups."""
+        await self.rollups.migrate(self.db.daily_stats, self.db.hourly_stats)
+        await self.db.daily_stats.drop()
+        await self.db.hourly_stats.drop()
+
+    async def migrate(self) -> None:
+        """
+        Run the pending one-off data migrations in the background.
+
+        Every step is flagged in the cache collection once it finished and
+        can be repeated after an interruption. A failed step is logged and
+        stops the later ones until the next start; the bot keeps running.
+        Rollup compaction starts afterwards.
+        """
+        steps = (
+            ("migrated", self.migrate_coll),
+            ("migrated_leaderboards", self.migrate_leaderboards),
+            ("migrated_edges", self.migrate_stats_edges),
+            ("migrated_rollups", self.migrate_rollups),
+            ("migrated_platforms", self.migrate_platforms),
+            ("migrated_durations", self.migrate_durations),
+        )
+        for flag, step in steps:
+            try:
+                if await self.cache.find_one({"_id": flag}):
+                    continue
+                await step()
+                await self.cache.insert_one({"_id": flag})
+            except Exception as e:
+                logger.error(f"Migration {step.__name__} failed: {e}", exc_info=True)
+                break
+        tasks.append(asyncio.create_task(self.rollups.start()))
 
+    async def load_cache(self) -> None:
+        await self.rollups.load_watermarks()
         await self.get_chats()
         await self.get_users()
         await self.get_blacklisted(True)
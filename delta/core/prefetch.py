@@ -0,0 +1,85 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+
+import asyncio
+
+from delta import clock, config, logger, queue, scheduler, yt
+from delta.helpers import Track
+
+
+class Prefetcher:
+    """
+    Resolves and downloads the next queued tracks of every playing chat.
+
+    Each chat keeps one task per wanted track (the current one plus the
+    next ``PREFETCH_DEPTH``); tasks of tracks that were skipped or removed
+    from the queue are cancelled. Downloads go through the scheduler as NOW
+    for the current track, NEXT for the one after it and WARM beyond.
+    """
+
+    def __init__(self, interval: float = 2.0):
+        self.depth = max(0, config.PREFETCH_DEPTH)
+        self.interval = interval
+        self.tasks: dict[int, dict[str, asyncio.Task]] = {}
+        self.cancelled = 0
+
+    def schedule(self, chat_id: int) -> None:
+        """Bring the chat's prefetch tasks in line with the head of its queue."""
+        from delta import anon
+
+        current = queue.get_current(chat_id)
+        wanted = ([current] if current else []) + queue.peek(chat_id, self.depth)
+        ids = {media.id for media in wanted}
+        tasks = self.tasks.setdefault(chat_id, {})
+
+        for media_id in [media_id for media_id in tasks if media_id not in ids]:
+            task = tasks.pop(media_id)
+            if not task.done():
+                task.cancel()
+                self.cancelled += 1
+
+        priorities = [scheduler.NOW] * bool(current) + [scheduler.NEXT] + [scheduler.WARM] * self.depth
+        for media, priority in zip(wanted, priorities):
+            if media.file_path or media.id in tasks:
+                continue
+            tasks[media.id] = asyncio.create_task(self._fetch(anon, chat_id, media, priority))
+
+        if not tasks:
+            self.tasks.pop(chat_id, None)
+
+    async def _fetch(self, anon, chat_id: int, entry, priority: int) -> None:
+        # Nothing awaits these tasks, so failures are logged here
+        try:
+            media = await anon.resolve(chat_id, entry)
+            if not media:
+                queue.remove(chat_id, entry.id)
+                return
+            if not media.file_path and isinstance(media, Track):
+                media.file_path = await yt.download(media.id, video=media.video, priority=priority)
+        except Exception as e:
+            logger.warning(f"Prefetch of {entry.id} failed in {chat_id}: {e}")
+
+    def cancel(self, chat_id: int) -> None:
+        """Cancel all prefetching for a chat."""
+        for task in self.tasks.pop(chat_id, {}).values():
+            if not task.done():
+                task.cancel()
+                self.cancelled += 1
+
+    def metrics(self) -> dict:
+        running = sum(
+            not task.done() for tasks in self.tasks.values() for task in tasks.values()
+        )
+        return {"running": running, "chats": len(self.tasks), "cancelled": self.cancelled}
+
+    async def start(self) -> None:
+        """Re-check every playing chat until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            for chat_id in set(clock.chats()) | set(self.tasks):
+                try:
+                    self.schedule(chat_id)
+                except Exception as e:
+                    logger.warning(f"Prefetch schedule failed in {chat_id}: {e}")
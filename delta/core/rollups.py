@@ -0,0 +1,251 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+
+import asyncio
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+from delta import logger
+
+
+TIERS = ("minute", "hour", "day", "month")
+
+# How long each tier is kept; months are kept forever.
+RETENTION = {
+    "minute": timedelta(days=2),
+    "hour": timedelta(days=40),
+    "day": timedelta(days=400),
+}
+
+
+def floor(ts: datetime, tier: str) -> datetime:
+    """Return the start of the bucket of ``tier`` containing ``ts``."""
+    if tier == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if tier == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if tier == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def step(ts: datetime, tier: str) -> datetime:
+    """Return the start of the bucket following the one starting at ``ts``."""
+    if tier == "minute":
+        return ts + timedelta(minutes=1)
+    if tier == "hour":
+        return ts + timedelta(hours=1)
+    if tier == "day":
+        return ts + timedelta(days=1)
+    return (ts.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def ceil(ts: datetime, tier: str) -> datetime:
+    start = floor(ts, tier)
+    return start if start == ts else step(start, tier)
+
+
+class Rollups:
+    """
+    Play counts bucketed by minute and compacted into hour, day and month
+    buckets.
+
+    Every document is ``{g, ts, t, count}`` where ``g`` is the tier, ``ts``
+    the bucket start and ``t`` the track id (``""`` for the total). Minute
+    buckets are written through the write buffer; ``compact`` sums every
+    complete bucket of a finer tier into the next one with idempotent
+    ``$set`` writes and remembers how far it got in a watermark. Fine tiers
+    expire through a TTL index on ``expire_at``.
+    """
+
+    def __init__(self, collection, cache, buffer, interval: float = 300):
+        """
+        Args:
+            collection: The rollups collection.
+            cache: The collection holding the compaction watermarks.
+            buffer: The write buffer minute buckets are queued on.
+            interval: Seconds between compaction runs.
+        """
+        self.db = collection
+        self.cache = cache
+        self.buffer = buffer
+        self.interval = interval
+        self.watermarks: dict[str, datetime] = {}
+
+    async def ensure_indexes(self) -> None:
+        await self.db.create_index([("g", 1), ("ts", 1), ("t", 1)])
+        await self.db.create_index("expire_at", expireAfterSeconds=0)
+
+    @staticmethod
+    def _id(tier: str, ts: datetime, track: str) -> str:
+        return f"{tier}:{ts:%Y%m%d%H%M}:{track}"
+
+    @staticmethod
+    def _fields(tier: str, ts: datetime, track: str) -> dict:
+        fields = {"g": tier, "ts": ts, "t": track}
+        if tier in RETENTION:
+            fields["expire_at"] = ts + RETENTION[tier]
+        return fields
+
+    def record(self, track_id: str, now: datetime = None) -> None:
+        """Count one play of a track in the current minute bucket."""
+        ts = floor(now or datetime.now(), "minute")
+        for track in ("", track_id):
+            self.buffer.inc(
+                self.db, self._id("minute", ts, track), {"count": 1},
+                self._fields("minute", ts, track),
+            )
+
+    async def load_watermarks(self) -> None:
+        doc = await self.cache.find_one({"_id": "rollup_watermarks"}) or {}
+        self.watermarks = {tier: doc[tier] for tier in TIERS[1:] if doc.get(tier)}
+
+    async def _save_watermark(self, tier: str, ts: datetime) -> None:
+        self.watermarks[tier] = ts
+        await self.cache.update_one(
+            {"_id": "rollup_watermarks"}, {"$set": {tier: ts}}, upsert=True
+        )
+
+    async def _compact_tier(self, fine: str, coarse: str, now: datetime) -> None:
+        # Leave the buffer time to flush the last minute before it is summed.
+        limit = floor(now - timedelta(seconds=self.buffer.interval * 2), coarse)
+        start = self.watermarks.get(coarse)
+        if start is None:
+            first = await self.db.find_one({"g": fine}, {"ts": 1}, sort=[("ts", 1)])
+            if not first:
+                return
+            start = floor(first["ts"], coarse)
+
+        while start < limit:
+            end = step(start, coarse)
+            ops = [
+                UpdateOne(
+                    {"_id": self._id(coarse, start, doc["_id"])},
+                    {"$set": {**self._fields(coarse, start, doc["_id"]), "count": doc["count"]}},
+                    upsert=True,
+                )
+                async for doc in self.db.aggregate([
+                    {"$match": {"g": fine, "ts": {"$gte": start, "$lt": end}}},
+                    {"$group": {"_id": "$t", "count": {"$sum": "$count"}}},
+                ])
+            ]
+            if ops:
+                await self.db.bulk_write(ops, ordered=False)
+            await self._save_watermark(coarse, end)
+            start = end
+
+    async def compact(self) -> None:
+        """Roll every complete bucket up into the next tier."""
+        now = datetime.now()
+        for fine, coarse in zip(TIERS, TIERS[1:]):
+            await self._compact_tier(fine, coarse, now)
+
+    async def start(self) -> None:
+        """Compact every interval until cancelled."""
+        await self.load_watermarks()
+        while True:
+            try:
+                await self.compact()
+            except Exception as e:
+                logger.warning(f"Rollup compaction failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def _cover(self, start: datetime, end: datetime, tier: str, now: datetime) -> list[tuple]:
+        """
+        Tile ``[start, end)`` with the coarsest compacted buckets, falling
+        back to finer tiers at the edges and past the watermark. A leading
+        edge the finer tier no longer keeps is widened to the whole bucket
+        of ``tier``, the closest count still stored.
+        """
+        if start >= end:
+            return []
+        index = TIERS.index(tier)
+        if index == 0:
+            return [("minute", start, end)]
+        finer = TIERS[index - 1]
+        if start <= now - RETENTION[finer]:
+            start = floor(start, tier)
+        lo = ceil(start, tier)
+        hi = floor(min(end, self.watermarks.get(tier, start)), tier)
+        if lo >= hi:
+            return self._cover(start, end, finer, now)
+        return [
+            *self._cover(start, lo, finer, now),
+            (tier, lo, hi),
+            *self._cover(hi, end, finer, now),
+        ]
+
+    def _match(self, start: datetime, end: datetime, tier: str = "month") -> dict:
+        return {
+            "$or": [
+                {"g": g, "ts": {"$gte": lo, "$lt": hi}}
+                for g, lo, hi in self._cover(start, end, tier, datetime.now())
+            ]
+        }
+
+    async def series(self, start: datetime, end: datetime, tier: str) -> dict:
+        """
+        Return total plays per ``tier`` bucket in ``[start, end)``, as far
+        back as ``tier`` is kept.
+        """
+        if tier in RETENTION:
+            start = max(start, ceil(datetime.now() - RETENTION[tier], tier))
+        counts = {}
+        cursor = self.db.find(
+            {**self._match(start, end, tier), "t": ""}, {"_id": 0, "ts": 1, "count": 1}
+        )
+        async for doc in cursor:
+            ts = floor(doc["ts"], tier)
+            counts[ts] = counts.get(ts, 0) + doc["count"]
+        return counts
+
+    async def top_tracks(self, start: datetime, end: datetime, limit: int = 10) -> list[tuple]:
+        """Return ``(track_id, plays)`` of the most played tracks in ``[start, end)``."""
+        cursor = self.db.aggregate([
+            {"$match": {**self._match(start, end), "t": {"$ne": ""}}},
+            {"$group": {"_id": "$t", "count": {"$sum": "$count"}}},
+            {"$sort": {"count": -1}},
+            {"$limit": limit},
+        ])
+        return [(doc["_id"], doc["count"]) async for doc in cursor]
+
+    async def migrate(self, daily, hourly) -> None:
+        """Import the old daily_stats and hourly_stats documents as buckets."""
+        ops = []
+        async for doc in daily.find():
+            try:
+                ts = datetime.strptime(doc["_id"], "%Y-%m-%d")
+            except (TypeError, ValueError):
+                continue
+            ops.append(UpdateOne(
+                {"_id": self._id("day", ts, "")},
+                {"$set": {**self._fields("day", ts, ""), "count": doc.get("count", 0)}},
+                upsert=True,
+            ))
+        async for doc in hourly.find():
+            try:
+                day = datetime.strptime(doc["_id"], "%Y-%m-%d")
+            except (TypeError, ValueError):
+                continue
+            for hour, count in (doc.get("hours") or {}).items():
+                if not str(hour).isdigit() or not 0 <= int(hour) < 24:
+                    continue
+                ts = day.replace(hour=int(hour))
+                ops.append(UpdateOne(
+                    {"_id": self._id("hour", ts, "")},
+                    {"$set": {**self._fields("hour", ts, ""), "count": count}},
+                    upsert=True,
+                ))
+        if ops:
+            await self.db.bulk_write(ops, ordered=False)
+
+        # Imported buckets are already complete, only new minutes roll up.
+        # A repeated import keeps the watermarks compaction has moved since.
+        now = datetime.now()
+        for tier in ("hour", "day"):
+            if tier not in self.watermarks:
+                await self._save_watermark(tier, floor(now, tier))
+        logger.info(f"Imported {len(ops)} daily and hourly buckets into rollups.")
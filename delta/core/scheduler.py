@@ -0,0 +1,126 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+
+import asyncio
+from contextlib import asynccontextmanager
+from itertools import count
+from time import monotonic
+
+from delta import config
+from delta.helpers import StageTimings
+
+
+class Ticket:
+    """A download's place in the scheduler, waiting or running."""
+
+    __slots__ = ("priority", "host", "seq", "created", "future")
+
+    def __init__(self, priority: int, host: str, seq: int):
+        self.priority = priority
+        self.host = host
+        self.seq = seq
+        self.created = monotonic()
+        self.future: asyncio.Future | None = None
+
+
+class DownloadScheduler:
+    """
+    Admits downloads by priority within global and per-host limits.
+
+    At most ``DOWNLOAD_CONCURRENCY`` downloads run at once, and at most
+    ``DOWNLOAD_PER_HOST`` per host (0 means only the global limit applies).
+    Waiting downloads start in priority order: NOW (a chat is waiting on it),
+    NEXT (the next track of a queue), USER (files requested with /song and
+    the like), then WARM (speculative prefetch). Running downloads cannot be
+    preempted, so the last free slot, globally and per host, is left to NOW.
+    """
+
+    NOW, NEXT, USER, WARM = range(4)
+    CLASSES = ("now", "next", "user", "warm")
+
+    def __init__(self, limit: int = None, per_host: int = None):
+        self.limit = max(1, config.DOWNLOAD_CONCURRENCY if limit is None else limit)
+        per_host = config.DOWNLOAD_PER_HOST if per_host is None else per_host
+        self.per_host = min(per_host, self.limit) if per_host > 0 else self.limit
+        self.running: dict[str, int] = {}
+        self.waiting: list[Ticket] = []
+        self.seq = count()
+        self.started = [0] * len(self.CLASSES)
+        self.waits = StageTimings()
+
+    def ticket(self, priority: int, host: str) -> Ticket:
+        return Ticket(priority, host, next(self.seq))
+
+    def _fits(self, ticket: Ticket) -> bool:
+        reserve = ticket.priority != self.NOW
+        total = sum(self.running.values())
+        host = self.running.get(ticket.host, 0)
+        return (
+            total < self.limit - (reserve and self.limit > 1)
+            and host < self.per_host - (reserve and self.per_host > 1)
+        )
+
+    def _dispatch(self) -> None:
+        # Futures of callers cancelled while waiting are already done
+        self.waiting = [ticket for ticket in self.waiting if not ticket.future.done()]
+        while True:
+            ready = [ticket for ticket in self.waiting if self._fits(ticket)]
+            if not ready:
+                return
+            ticket = min(ready, key=lambda t: (t.priority, t.seq))
+            self.waiting.remove(ticket)
+            self.running[ticket.host] = self.running.get(ticket.host, 0) + 1
+            self.started[ticket.priority] += 1
+            self.waits.record(self.CLASSES[ticket.priority], monotonic() - ticket.created)
+            ticket.future.set_result(None)
+
+    def bump(self, ticket: Ticket, priority: int) -> None:
+        """Raise the priority of a ticket, e.g. when a chat starts waiting on it."""
+        if priority < ticket.priority:
+            ticket.priority = priority
+            if ticket.future and not ticket.future.done():
+                self._dispatch()
+
+    async def acquire(self, ticket: Ticket) -> None:
+        ticket.future = asyncio.get_running_loop().create_future()
+        self.waiting.append(ticket)
+        self._dispatch()
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # Admitted just before the cancellation arrived
+                self.release(ticket)
+            raise
+
+    def release(self, ticket: Ticket) -> None:
+        self.running[ticket.host] -= 1
+        if not self.running[ticket.host]:
+            del self.running[ticket.host]
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: int, host: str, ticket: Ticket = None):
+        """Hold a download slot for the duration of the ``async with`` block."""
+        ticket = ticket or self.ticket(priority, host)
+        await self.acquire(ticket)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def metrics(self) -> dict:
+        queued = [0] * len(self.CLASSES)
+        for ticket in self.waiting:
+            if not ticket.future.done():
+                queued[ticket.priority] += 1
+        return {
+            "running": sum(self.running.values()),
+            "limit": self.limit,
+            "hosts": dict(self.running),
+            "queued": dict(zip(self.CLASSES, queued)),
+            "started": dict(zip(self.CLASSES, self.started)),
+            "wait": self.waits.metrics(),
+        }
@@ -9,22 +9,24 @@ import time
 
 from pyrogram import types
 
-from delta import config
-from delta.helpers import Media, buttons, utils
+from delta import config, scheduler
+from delta.helpers import BoundedCache, Media, buttons, utils
 
 
 class Telegram:
     def __init__(self):
         self.active = []
         self.events = {}
-        self.last_edit = {}
+        self.last_edit = BoundedCache(maxsize=1000, ttl=3600)
         self.active_tasks = {}
         self.sleep = 5
 
     def get_media(self, msg: types.Message) -> bool:
         return any([msg.video, msg.audio, msg.document, msg.voice])
 
-    async def download(self, msg: types.Message, sent: types.Message) -> Media | None:
+    async def download(
+        self, msg: types.Message, sent: types.Message, priority: int = scheduler.USER
+    ) -> Media | None:
         msg_id = sent.id
         event = asyncio.Event()
         self.events[msg_id] = event
@@ -52,7 +54,7 @@ class Telegram:
                 return
 
             now = time.time()
-            if now - self.last_edit[msg_id] < self.sleep:
+            if now - self.last_edit.get(msg_id, 0) < self.sleep:
                 return
 
             self.last_edit[msg_id] = now
@@ -79,9 +81,11 @@ class Telegram:
                     return await sent.stop_propagation()
 
                 self.active.append(file_id)
-                task = asyncio.create_task(
-                    msg.download(file_name=file_path, progress=progress)
-                )
+                async def _download():
+                    async with scheduler.slot(priority, "telegram"):
+                        return await msg.download(file_name=file_path, progress=progress)
+
+                task = asyncio.create_task(_download())
                 self.active_tasks[msg_id] = task
                 await task
                 self.active.remove(file_id)
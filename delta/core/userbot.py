@@ -11,52 +11,42 @@ from delta import config, logger
 class Userbot(Client):
     def __init__(self):
         """
-        Initializes the userbot with multiple clients.
+        Initializes the userbot with one client per session string.
 
-        This method sets up clients for the userbot using predefined session strings.
-        Each client is assigned a unique name based on the key in the `clients` dictionary.
+        ``pool`` holds a client for every configured session (``SESSION``,
+        ``SESSION2`` ... ``SESSIONn``); ``clients`` lists the ones that booted,
+        in order, and assistant number ``n`` is ``clients[n - 1]``.
         """
         self.clients = []
-        clients = {"one": "SESSION1", "two": "SESSION2", "three": "SESSION3"}
-        for key, string_key in clients.items():
-            name = f"AnonyUB{key[-1]}"
-            session = getattr(config, string_key)
-            setattr(
-                self,
-                key,
-                Client(
-                    name=name,
-                    api_id=config.API_ID,
-                    api_hash=config.API_HASH,
-                    session_string=session,
-                ),
+        self.pool = [
+            Client(
+                name=f"AnonyUB{num}",
+                api_id=config.API_ID,
+                api_hash=config.API_HASH,
+                session_string=session,
             )
+            for num, session in enumerate(config.SESSIONS, start=1)
+        ]
 
-    async def boot_client(self, num: int, ub: Client):
+    async def boot_client(self, num: int, client: Client):
         """
         Boot a client and perform initial setup.
         Args:
-            num (int): The client number to boot (1, 2, or 3).
-            ub (Client): The userbot client instance.
+            num (int): The assistant number of the client.
+            client (Client): The userbot client instance.
         Raises:
             SystemExit: If the client fails to send a message in the log group.
         """
-        clients = {
-            1: self.one,
-            2: self.two,
-            3: self.three,
-        }
-        client = clients[num]
         await client.start()
         try:
             await client.send_message(config.LOGGER_ID, "Assistant Started")
         except:
             raise SystemExit(f"Assistant {num} failed to send message in log group.")
 
-        client.id = ub.me.id
-        client.name = ub.me.first_name
-        client.username = ub.me.username
-        client.mention = ub.me.mention
+        client.id = client.me.id
+        client.name = client.me.first_name
+        client.username = client.me.username
+        client.mention = client.me.mention
         self.clients.append(client)
 
         logger.info(f"Assistant {num} started as @{client.username}")
@@ -65,21 +55,13 @@ class Userbot(Client):
         """
         Asynchronously starts the assistants.
         """
-        if config.SESSION1:
-            await self.boot_client(1, self.one)
-        if config.SESSION2:
-            await self.boot_client(2, self.two)
-        if config.SESSION3:
-            await self.boot_client(3, self.three)
+        for num, client in enumerate(self.pool, start=1):
+            await self.boot_client(num, client)
 
     async def exit(self):
         """
         Asynchronously stops the assistants.
         """
-        if config.SESSION1:
-            await self.one.stop()
-        if config.SESSION2:
-            await self.two.stop()
-        if config.SESSION3:
-            await self.three.stop()
+        for client in self.clients:
+            await client.stop()
         logger.info("Assistants stopped.")
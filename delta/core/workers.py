@@ -0,0 +1,110 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+
+import asyncio
+import copy
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import yt_dlp
+
+from delta import config, logger
+
+# YoutubeDL instances of this worker (process or thread), by their options
+_local = threading.local()
+
+
+def _ydl(opts: dict) -> yt_dlp.YoutubeDL:
+    # A reused instance keeps its cookie jar, extractors and solved player code.
+    instances = _local.__dict__.setdefault("instances", {})
+    key = repr(sorted(opts.items()))
+    ydl = instances.get(key)
+    if ydl is None:
+        ydl = instances[key] = yt_dlp.YoutubeDL(opts)
+    return ydl
+
+
+def _portable(info: dict) -> dict:
+    # Drop callables (lazy fragment and comment extractors) that cannot be pickled.
+    info = {key: value for key, value in info.items() if not callable(value)}
+    if info.get("formats"):
+        info["formats"] = [
+            {key: value for key, value in fmt.items() if not callable(value)}
+            for fmt in info["formats"]
+        ]
+    return info
+
+
+def _run(job, *args):
+    try:
+        return job(*args)
+    except (yt_dlp.utils.DownloadError, yt_dlp.utils.ExtractorError) as e:
+        # The originals hold tracebacks, which would not reach the bot process.
+        raise yt_dlp.utils.DownloadError(str(e)) from None
+
+
+def _extract(url: str, opts: dict, process: bool) -> dict | None:
+    info = _ydl(opts).extract_info(url, download=False, process=process)
+    return _portable(info) if info else None
+
+
+def _download(info: dict, opts: dict) -> None:
+    _ydl(opts).process_ie_result(info, download=True)
+
+
+class WorkerPool:
+    """
+    Long-lived yt-dlp worker processes.
+
+    Extraction and downloads run in ``YTDL_WORKERS`` processes, so their CPU
+    work does not hold the GIL of the event loop. Each worker keeps one warm
+    ``YoutubeDL`` per option set. The workers are forked when the pool is
+    created, which happens before the bot starts any thread. With no workers
+    configured, or once the pool breaks, jobs run in threads instead.
+    """
+
+    def __init__(self, size: int = None):
+        self.size = max(0, config.YTDL_WORKERS if size is None else size)
+        self.pool = None
+        self.jobs = 0
+        if self.size:
+            self.pool = ProcessPoolExecutor(
+                self.size, mp_context=multiprocessing.get_context("fork")
+            )
+            # Fork every worker now, while the process is still single-threaded.
+            self.pool.submit(int)
+
+    async def _submit(self, job, *args):
+        self.jobs += 1
+        try:
+            if self.pool:
+                try:
+                    return await asyncio.get_running_loop().run_in_executor(
+                        self.pool, _run, job, *args
+                    )
+                except BrokenProcessPool:
+                    logger.warning("yt-dlp worker pool broke; using threads from now on.")
+                    self.pool = None
+            return await asyncio.to_thread(_run, job, *args)
+        finally:
+            self.jobs -= 1
+
+    async def extract(self, url: str, opts: dict, process: bool = True) -> dict | None:
+        """Run ``extract_info`` without downloading and return the info dict."""
+        return await self._submit(_extract, url, opts, process)
+
+    async def download(self, info: dict, opts: dict) -> None:
+        """Select formats and download an extracted (unprocessed) info dict."""
+        # Processing fills in the dict; in a thread it would be the caller's copy.
+        await self._submit(_download, info if self.pool else copy.deepcopy(info), opts)
+
+    def metrics(self) -> dict:
+        return {"workers": self.size if self.pool else 0, "jobs": self.jobs}
+
+    def shutdown(self) -> None:
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
@@ -5,16 +5,80 @@
 
 import os
 import re
+import asyncio
 import yt_dlp
 import random
-import asyncio
 import aiohttp
+from datetime import datetime, timedelta
 from pathlib import Path
+from time import time
+
+from py_yt import VideosSearch
+
+from delta import db, logger, scheduler, workers
+from delta.helpers import BoundedCache, LazyTrack, Track, utils
+
+# Track fields that describe the video, as opposed to one request of it
+META_FIELDS = (
+    "id", "channel_name", "duration", "duration_sec", "title", "url",
+    "thumbnail", "view_count",
+)
+MISSING = object()
+# yt-dlp errors of videos that will not come back; anything else (timeouts,
+# bot checks, network errors) may pass on the next try and is not cached
+GONE = ("video unavailable", "private video", "has been removed", "been terminated")
+
+
+class MetaCache:
+    """
+    Two-tier cache of YouTube metadata.
 
-from py_yt import Playlist, VideosSearch
+    Lookups try an in-process BoundedCache first and the shared ``yt_cache``
+    collection second, so every instance on the same database reads what
+    any of them fetched. Keys are ``v:<video id>`` for videos and
+    ``q:<query>`` / ``s:<limit>:<query>`` for searches. Misses are cached as
+    ``None`` for ``negative_ttl`` seconds so a dead link or a query without
+    results is not fetched again on every request.
+    """
+
+    def __init__(self, collection, ttl: int = 3 * 86400, negative_ttl: int = 600):
+        self.db = collection
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory = BoundedCache(maxsize=5000, ttl=ttl, name="yt_meta")
+
+    async def ensure_indexes(self) -> None:
+        await self.db.create_index("expire_at", expireAfterSeconds=0)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        # Capped so the key stays well inside the _id index limit
+        return " ".join(query.lower().split())[:200]
+
+    async def get(self, key: str):
+        """Return the cached value (``None`` for a cached miss) or ``MISSING``."""
+        entry = self.memory.get(key)
+        if entry and entry[0] > time():
+            return entry[1]
+        try:
+            doc = await self.db.find_one({"_id": key})
+        except Exception as e:
+            logger.warning(f"Metadata cache lookup failed: {e}")
+            return MISSING
+        # The TTL monitor only runs once a minute
+        if not doc or doc["expire_at"] <= datetime.utcnow():
+            return MISSING
+        remaining = (doc["expire_at"] - datetime.utcnow()).total_seconds()
+        self.memory[key] = (time() + remaining, doc["value"])
+        return doc["value"]
 
-from delta import logger
-from delta.helpers import Track, utils
+    def set(self, key: str, value) -> None:
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self.memory[key] = (time() + ttl, value)
+        db.buffer.replace(self.db, key, {
+            "value": value,
+            "expire_at": datetime.utcnow() + timedelta(seconds=ttl),
+        })
 
 
 class YouTube:
@@ -24,6 +88,11 @@ class YouTube:
         self.checked = False
         self.cookie_dir = "delta/cookies"
         self.warned = False
+        self.cache = MetaCache(db.db.yt_cache)
+        # Unprocessed info dicts, reused by the download that usually follows
+        self.infos = BoundedCache(maxsize=32, ttl=600, name="yt_info")
+        # (video_id, video) -> [download task, scheduler ticket, waiting callers]
+        self.downloading: dict[tuple[str, bool], list] = {}
         self.regex = re.compile(
             r"(https?://)?(www\.|m\.|music\.)?"
             r"(youtube\.com/(watch\?v=|shorts/|playlist\?list=)|youtu\.be/)"
@@ -70,21 +139,54 @@ class YouTube:
             return match.group(1)
         return None
 
+    async def extract(self, video_id: str, cookie: str | None = MISSING) -> dict | None:
+        """
+        Extract a video's page once and keep the result for a few minutes.
+
+        The dict is not processed (no format selection), so the same result
+        serves metadata lookups and, through ``process_ie_result``, the
+        download of either format.
+        """
+        info = self.infos.get(video_id)
+        if info:
+            return info
+
+        if cookie is MISSING:
+            cookie = self.get_cookies()
+        opts = {"quiet": True, "no_warnings": True}
+        if cookie:
+            opts["cookiefile"] = cookie
+
+        info = await workers.extract(self.base + video_id, opts, process=False)
+        if info:
+            self.infos[video_id] = info
+        return info
+
+    @staticmethod
+    def _thumbnail(info: dict) -> str:
+        # Unprocessed results only carry the unsorted thumbnail list
+        if info.get("thumbnail"):
+            return info["thumbnail"]
+        thumbnails = info.get("thumbnails") or [{}]
+        best = max(thumbnails, key=lambda t: (t.get("preference") or 0, t.get("width") or 0))
+        return best.get("url", "")
+
+    @staticmethod
+    def _track(meta: dict, m_id: int, video: bool, user_id: int) -> Track:
+        return Track(**meta, message_id=m_id, video=video, user_id=user_id)
+
     async def get_video_info(self, video_id: str, m_id: int, video: bool = False, user_id: int = 0) -> Track | None:
         """Get video info directly using yt_dlp."""
+        key = f"v:{video_id}"
+        meta = await self.cache.get(key)
+        if meta is not MISSING:
+            return self._track(meta, m_id, video, user_id) if meta else None
+
         url = self.base + video_id
         try:
-            def _get_info():
-                opts = {"quiet": True, "no_warnings": True}
-                cookie = self.get_cookies()
-                if cookie:
-                    opts["cookiefile"] = cookie
-                with yt_dlp.YoutubeDL(opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                    return info
-            
-            info = await asyncio.to_thread(_get_info)
+            info = await self.extract(video_id)
             if not info:
+                self.cache.set(key, None)
                 return None
             
             duration_sec = info.get("duration", 0)
@@ -92,19 +194,26 @@ class YouTube:
             seconds = duration_sec % 60
             duration = f"{minutes}:{seconds:02d}"
             
-            return Track(
+            track = Track(
                 id=info.get("id"),
                 channel_name=info.get("channel", info.get("uploader", "")),
                 duration=duration,
                 duration_sec=duration_sec,
                 message_id=m_id,
                 title=info.get("title"),
-                thumbnail=info.get("thumbnail", ""),
+                thumbnail=self._thumbnail(info),
                 url=info.get("webpage_url", url),
                 view_count=str(info.get("view_count", "")),
                 video=video,
                 user_id=user_id,
             )
+            self.cache.set(key, {name: getattr(track, name) for name in META_FIELDS})
+            return track
+        except yt_dlp.utils.DownloadError as e:
+            logger.error(f"Failed to get video info: {e}")
+            if any(text in str(e).lower() for text in GONE):
+                self.cache.set(key, None)
+            return None
         except Exception as e:
             logger.error(f"Failed to get video info: {e}")
             return None
@@ -116,6 +225,11 @@ class YouTube:
             if video_id:
                 return await self.get_video_info(video_id, m_id, video, user_id)
         
+        key = f"q:{self.cache.normalize(query)}"
+        meta = await self.cache.get(key)
+        if meta is not MISSING:
+            return self._track(meta, m_id, video, user_id) if meta else None
+
         # Regular search
         try:
             _search = VideosSearch(query, limit=1, with_live=False)
@@ -125,7 +239,7 @@ class YouTube:
              
         if results and results["result"]:
             data = results["result"][0]
-            return Track(
+            track = Track(
                 id=data.get("id"),
                 channel_name=data.get("channel", {}).get("name"),
                 duration=data.get("duration"),
@@ -138,56 +252,120 @@ class YouTube:
                 video=video,
                 user_id=user_id,
             )
+            self.cache.set(key, {name: getattr(track, name) for name in META_FIELDS})
+            return track
+        self.cache.set(key, None)
         return None
 
-    async def playlist(self, limit: int, user: str, url: str, video: bool) -> list[Track | None]:
-        tracks = []
+    async def search_results(self, query: str, limit: int) -> list[dict]:
+        """Return the raw results of a search, e.g. for inline queries."""
+        key = f"s:{limit}:{self.cache.normalize(query)}"
+        results = await self.cache.get(key)
+        if results is not MISSING:
+            return results or []
+        results = (await VideosSearch(query, limit=limit).next()).get("result", [])
+        self.cache.set(key, results or None)
+        return results
+
+    async def playlist(self, limit: int, user: str, url: str, video: bool, user_id: int = 0) -> list[LazyTrack]:
+        """List a playlist as lazy entries; only ids and titles are fetched."""
+        opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "extract_flat": "in_playlist",
+            "playlistend": limit,
+        }
+        cookie = self.get_cookies()
+        if cookie:
+            opts["cookiefile"] = cookie
+
         try:
-            plist = await Playlist.get(url)
-            for data in plist["videos"][:limit]:
-                track = Track(
-                    id=data.get("id"),
-                    channel_name=data.get("channel", {}).get("name", ""),
-                    duration=data.get("duration"),
-                    duration_sec=utils.to_seconds(data.get("duration")),
-                    title=data.get("title")[:25],
-                    thumbnail=data.get("thumbnails")[-1].get("url").split("?")[0],
-                    url=data.get("link").split("&list=")[0],
-                    user=user,
-                    view_count="",
-                    video=video,
-                    user_id=0  # Playlist user_id handling can be improved later if needed
-                )
-                tracks.append(track)
-        except:
-            pass
-        return tracks
+            info = await workers.extract(url, opts)
+            entries = (info or {}).get("entries") or []
+        except Exception as e:
+            logger.error(f"Failed to get playlist: {e}")
+            return []
+        return [
+            LazyTrack(
+                id=data["id"],
+                title=(data.get("title") or data["id"])[:25],
+                duration_sec=int(data.get("duration") or 0),
+                user=user,
+                user_id=user_id,
+                video=video,
+            )
+            for data in entries[:limit]
+            if data and data.get("id")
+        ]
+
+    async def resolve(self, entry: LazyTrack) -> Track | None:
+        """Fetch the full metadata of a lazy queue entry."""
+        track = await self.get_video_info(entry.id, entry.message_id, entry.video, entry.user_id)
+        if track:
+            track.user = entry.user
+            track.file_path = entry.file_path
+        return track
 
     async def formats(self, video_id: str, lyrics: bool = False):
         """Get available formats for a YouTube video."""
         url = self.base + video_id
         try:
-            def _get_formats():
-                with yt_dlp.YoutubeDL({"quiet": True}) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                    return info.get("formats", []), url
-            
-            return await asyncio.to_thread(_get_formats)
+            info = await self.extract(video_id)
+            return (info or {}).get("formats", []), url
         except Exception as e:
             logger.error(f"Failed to get formats: {e}")
             return [], url
 
-    async def download(self, video_id: str, video: bool = False) -> str | None:
-        url = self.base + video_id
+    async def download(self, video_id: str, video: bool = False, priority: int = scheduler.USER) -> str | None:
+        """
+        Download a video, sharing one download between concurrent callers.
+
+        A caller with a higher ``priority`` than the download it joins
+        raises the priority of that download.
+        """
         ext = "mp4" if video else "webm"
         filename = f"downloads/{video_id}.{ext}"
 
         if Path(filename).exists():
             return filename
 
+        key = (video_id, video)
+        entry = self.downloading.get(key)
+        if entry:
+            scheduler.bump(entry[1], priority)
+        else:
+            ticket = scheduler.ticket(priority, "youtube")
+            task = asyncio.ensure_future(self._download(video_id, video, filename, ticket))
+            entry = self.downloading[key] = [task, ticket, 0]
+            task.add_done_callback(lambda _: self._forget(key, entry))
+
+        # One caller giving up (e.g. a skipped prefetch) must not cancel it
+        # for the rest, but once nobody waits the slot is freed.
+        entry[2] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            entry[2] -= 1
+            if not entry[2] and not entry[0].done():
+                self._forget(key, entry)
+                entry[0].cancel()
+
+    def _forget(self, key: tuple, entry: list) -> None:
+        if self.downloading.get(key) is entry:
+            del self.downloading[key]
+
+    async def _download(self, video_id: str, video: bool, filename: str, ticket) -> str | None:
+        async with scheduler.slot(ticket.priority, ticket.host, ticket):
+            return await self._fetch(video_id, video, filename)
+
+    async def _fetch(self, video_id: str, video: bool, filename: str) -> str | None:
+        # yt-dlp writes into downloads/tmp; the file only appears under its
+        # final name, which callers take as "ready", once it is complete.
+        # The template stays fixed so workers keep reusing one YoutubeDL.
+        temp = filename.replace("downloads/", "downloads/tmp/", 1)
         cookie = self.get_cookies()
         base_opts = {
-            "outtmpl": "downloads/%(id)s.%(ext)s",
+            "outtmpl": "downloads/tmp/%(id)s.%(ext)s",
             "quiet": True,
             "noplaylist": True,
             "geo_bypass": True,
@@ -209,16 +387,30 @@ class YouTube:
                 "format": "bestaudio[ext=webm][acodec=opus]",
             }
 
-        def _download():
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                try:
-                    ydl.download([url])
-                except (yt_dlp.utils.DownloadError, yt_dlp.utils.ExtractorError):
-                    if cookie: self.cookies.remove(cookie)
-                    return None
-                except Exception as ex:
-                    logger.warning("Download failed: %s", ex)
-                    return None
-            return filename
+        try:
+            info = await self.extract(video_id, cookie)
+        except (yt_dlp.utils.DownloadError, yt_dlp.utils.ExtractorError):
+            if cookie in self.cookies: self.cookies.remove(cookie)
+            return None
+        except Exception as ex:
+            logger.warning("Download failed: %s", ex)
+            return None
+        if not info:
+            return None
+
+        try:
+            await workers.download(info, ydl_opts)
+            os.replace(temp, filename)
+            path = filename
+        except (yt_dlp.utils.DownloadError, yt_dlp.utils.ExtractorError):
+            if cookie in self.cookies: self.cookies.remove(cookie)
+            path = None
+        except Exception as ex:
+            logger.warning("Download failed: %s", ex)
+            path = None
 
-        return await asyncio.to_thread(_download)
+        if not path:
+            # Format URLs of a failed attempt may have expired; extract afresh next time
+            self.infos.pop(video_id)
+            Path(temp).unlink(missing_ok=True)
+        return path
@@ -139,14 +139,14 @@ async def read_manifest():
 async def get_overview():
     """Get overall statistics overview"""
     try:
-        users = await db.get_users()
-        chats = await db.get_chats()
+        users = await db.count_users()
+        chats = await db.count_chats()
         total_plays = await db.get_queries()
-        active_calls = await db.active_callsdb.count_documents({})
+        active_calls = len(db.active_calls)
 
         return StatsOverview(
-            total_users=len(users),
-            total_chats=len(chats),
+            total_users=users,
+            total_chats=chats,
             total_plays=total_plays,
             active_calls=active_calls
         )
@@ -156,10 +156,13 @@ async def get_overview():
 
 
 @dashboard_app.get("/api/top-tracks")
-async def get_top_tracks(limit: int = 10):
-    """Get top played tracks globally"""
+async def get_top_tracks(limit: int = 10, days: int = 0):
+    """Get top played tracks globally, or of the last N days"""
     try:
-        tracks = await db.get_global_tops(limit=limit)
+        if days > 0:
+            tracks = await db.get_top_tracks(days=days, limit=limit)
+        else:
+            tracks = await db.get_global_tops(limit=limit)
         
         result = []
         for track_id, data in tracks.items():
@@ -406,10 +409,10 @@ async def broadcast_stats():
     while True:
         try:
             # 1. Overview Stats
-            users_count = len(await db.get_users())
-            chats_count = len(await db.get_chats())
+            users_count = await db.count_users()
+            chats_count = await db.count_chats()
             plays_count = await db.get_queries()
-            active_calls = await db.active_callsdb.count_documents({})
+            active_calls = len(db.active_calls)
             
             # System Stats
             sys_stats = None
@@ -8,8 +8,12 @@ All modules here use lazy imports internally to avoid circular imports
 """
 
 # These modules don't have top-level anony imports (safe to import)
-from delta.helpers._dataclass import Media, Track
+from delta.helpers._dataclass import ChatSettings, LazyTrack, Media, Track
+from delta.helpers._cache import BoundedCache
+from delta.helpers._idset import IdSet
 from delta.helpers._queue import Queue
+from delta.helpers._clock import PlaybackClock
+from delta.helpers._timings import StageTimings
 
 # Import classes/functions that use lazy imports internally
 from delta.helpers._admins import admin_check, can_manage_vc, is_admin, reload_admins
@@ -24,10 +28,16 @@ utils = Utilities()
 # Export all
 __all__ = [
     # Dataclasses
+    "ChatSettings",
+    "LazyTrack",
     "Media",
     "Track",
     # Queue
     "Queue",
+    "PlaybackClock",
+    "BoundedCache",
+    "IdSet",
+    "StageTimings",
     # Admin utilities
     "admin_check",
     "can_manage_vc", 
@@ -0,0 +1,114 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+
+from collections import OrderedDict
+from time import monotonic
+from weakref import WeakValueDictionary
+
+_MISSING = object()
+
+
+class BoundedCache:
+    """
+    Dictionary-like cache bounded by size and idle time.
+
+    Keys are kept in access order; the least recently used key is evicted
+    once ``maxsize`` is exceeded (``0`` disables the limit) and keys not
+    read or written for ``ttl`` seconds expire (``None`` keeps them).
+    Named caches are listed in ``BoundedCache.registry`` for metrics.
+    """
+
+    registry: "WeakValueDictionary[str, BoundedCache]" = WeakValueDictionary()
+
+    def __init__(self, maxsize: int = 1000, ttl: float | None = None, name: str = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if name:
+            self.registry[name] = self
+
+    def _expire(self) -> None:
+        # Idle entries are always at the front, since every access moves a key to the end.
+        if self.ttl is None:
+            return
+        now = monotonic()
+        while self.data:
+            key, (_, touched) = next(iter(self.data.items()))
+            if now - touched < self.ttl:
+                break
+            del self.data[key]
+            self.expirations += 1
+
+    def get(self, key, default=None):
+        self._expire()
+        entry = self.data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.data[key] = (entry[0], monotonic())
+        self.data.move_to_end(key)
+        return entry[0]
+
+    def set(self, key, value) -> None:
+        self._expire()
+        self.data[key] = (value, monotonic())
+        self.data.move_to_end(key)
+        while self.maxsize and len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def setdefault(self, key, factory):
+        """Return the value of ``key``, storing ``factory()`` first if it is missing."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def pop(self, key, default=None):
+        entry = self.data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def clear(self) -> None:
+        self.data.clear()
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key) -> None:
+        del self.data[key]
+
+    def __contains__(self, key) -> bool:
+        self._expire()
+        return key in self.data
+
+    def __len__(self) -> int:
+        self._expire()
+        return len(self.data)
+
+    def __iter__(self):
+        self._expire()
+        return iter(list(self.data))
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,60 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+
+from time import monotonic
+
+
+class _Clock:
+    __slots__ = ("started", "offset", "paused")
+
+    def __init__(self, offset: float):
+        self.started = monotonic()
+        self.offset = offset
+        self.paused = 0.0
+
+
+class PlaybackClock:
+    """
+    Per-chat playback position derived from monotonic timestamps.
+
+    Only start, pause and resume events are recorded; the elapsed position
+    is computed when it is read, so nothing has to tick while a track plays.
+    """
+
+    def __init__(self):
+        self.clocks: dict[int, _Clock] = {}
+
+    def start(self, chat_id: int, position: float = 0) -> None:
+        """Start (or restart after a seek) the clock at the given position in seconds."""
+        self.clocks[chat_id] = _Clock(position)
+
+    def pause(self, chat_id: int) -> None:
+        clock = self.clocks.get(chat_id)
+        if clock and not clock.paused:
+            clock.paused = monotonic()
+
+    def resume(self, chat_id: int) -> None:
+        clock = self.clocks.get(chat_id)
+        if clock and clock.paused:
+            clock.started += monotonic() - clock.paused
+            clock.paused = 0.0
+
+    def stop(self, chat_id: int) -> None:
+        self.clocks.pop(chat_id, None)
+
+    def elapsed(self, chat_id: int) -> int | None:
+        """Return the playback position in whole seconds, or None if nothing plays."""
+        clock = self.clocks.get(chat_id)
+        if not clock:
+            return None
+        return int(clock.offset + (clock.paused or monotonic()) - clock.started)
+
+    def is_paused(self, chat_id: int) -> bool:
+        clock = self.clocks.get(chat_id)
+        return bool(clock and clock.paused)
+
+    def chats(self) -> list[int]:
+        """Return the chats that currently have a running or paused clock."""
+        return list(self.clocks)
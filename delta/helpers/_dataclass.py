@@ -3,37 +3,238 @@
 # This file is part of AnonXMusic
 
 
+import sys
 from dataclasses import dataclass
 
 
-@dataclass
-class Media:
-    id: str
-    duration: str
-    duration_sec: int
-    file_path: str
-    message_id: int
-    title: str
-    url: str
-    time: int = 0
-    user: str = None
-    user_id: int = 0
-    video: bool = False
+YT_URL = "https://www.youtube.com/watch?v="
+YT_THUMB = "https://i.ytimg.com/vi/"
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def format_duration(seconds: int) -> str:
+    minutes, seconds = divmod(int(seconds or 0), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class _Record:
+    """
+    Base of the slotted queue records.
+
+    ``FIELDS`` lists the public attributes in constructor order; some are
+    properties that derive their value from other fields and only store an
+    override when the given value cannot be derived.
+    """
+
+    __slots__ = ()
+    FIELDS: tuple[str, ...] = ()
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __repr__(self) -> str:
+        args = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({args})"
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    @property
+    def user(self) -> str | None:
+        return self._user
+
+    @user.setter
+    def user(self, value: str | None) -> None:
+        # Mentions repeat for every track a user queues
+        self._user = _intern(value)
+
+    @property
+    def duration(self) -> str:
+        return self._duration or format_duration(self.duration_sec)
+
+    @duration.setter
+    def duration(self, value: str | None) -> None:
+        # Only durations that differ from the formatted seconds are stored
+        if value == format_duration(self.duration_sec):
+            value = None
+        self._duration = _intern(value)
+
+
+class Media(_Record):
+    __slots__ = (
+        "id", "_duration", "duration_sec", "file_path", "message_id",
+        "title", "url", "_user", "user_id", "video",
+    )
+    FIELDS = (
+        "id", "duration", "duration_sec", "file_path", "message_id",
+        "title", "url", "user", "user_id", "video",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        duration: str = None,
+        duration_sec: int = 0,
+        file_path: str = None,
+        message_id: int = 0,
+        title: str = "",
+        url: str = None,
+        user: str = None,
+        user_id: int = 0,
+        video: bool = False,
+    ):
+        self.id = id
+        self.duration_sec = duration_sec
+        self.duration = duration
+        self.file_path = file_path
+        self.message_id = message_id
+        self.title = title
+        self.url = url
+        self.user = user
+        self.user_id = user_id
+        self.video = video
+
+
+class Track(_Record):
+    __slots__ = (
+        "id", "_channel_name", "_duration", "duration_sec", "title", "_url",
+        "file_path", "message_id", "_thumbnail", "_user", "user_id",
+        "_view_count", "video",
+    )
+    FIELDS = (
+        "id", "channel_name", "duration", "duration_sec", "title", "url",
+        "file_path", "message_id", "thumbnail", "user", "user_id",
+        "view_count", "video",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        channel_name: str = None,
+        duration: str = None,
+        duration_sec: int = 0,
+        title: str = "",
+        url: str = None,
+        file_path: str = None,
+        message_id: int = 0,
+        thumbnail: str = None,
+        user: str = None,
+        user_id: int = 0,
+        view_count: str = None,
+        video: bool = False,
+    ):
+        self.id = id
+        self.channel_name = channel_name
+        self.duration_sec = duration_sec
+        self.duration = duration
+        self.title = title
+        self.url = url
+        self.file_path = file_path
+        self.message_id = message_id
+        self.thumbnail = thumbnail
+        self.user = user
+        self.user_id = user_id
+        self.view_count = view_count
+        self.video = video
+
+    @property
+    def channel_name(self) -> str | None:
+        return self._channel_name
+
+    @channel_name.setter
+    def channel_name(self, value: str | None) -> None:
+        self._channel_name = _intern(value)
+
+    @property
+    def view_count(self) -> str | None:
+        return self._view_count
+
+    @view_count.setter
+    def view_count(self, value: str | None) -> None:
+        self._view_count = _intern(value)
+
+    @property
+    def url(self) -> str | None:
+        # An empty string stands for the YouTube watch url of the id
+        return YT_URL + self.id if self._url == "" else self._url
+
+    @url.setter
+    def url(self, value: str | None) -> None:
+        self._url = "" if value == YT_URL + self.id else value
+
+    @property
+    def thumbnail(self) -> str | None:
+        # YouTube thumbnails are stored as their shared file name, e.g. "hq720.jpg"
+        value = self._thumbnail
+        if value and "/" not in value:
+            return f"{YT_THUMB}{self.id}/{value}"
+        return value
+
+    @thumbnail.setter
+    def thumbnail(self, value: str | None) -> None:
+        prefix = f"{YT_THUMB}{self.id}/"
+        if value and value.startswith(prefix) and "/" not in value[len(prefix):]:
+            value = _intern(value[len(prefix):])
+        self._thumbnail = value
+
+
+class LazyTrack(_Record):
+    """Queue entry that is resolved into a Track shortly before it plays."""
+
+    __slots__ = (
+        "id", "title", "duration_sec", "_user", "user_id", "video",
+        "file_path", "message_id",
+    )
+    FIELDS = (
+        "id", "title", "duration_sec", "user", "user_id", "video",
+        "file_path", "message_id",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        title: str = "",
+        duration_sec: int = 0,
+        user: str = None,
+        user_id: int = 0,
+        video: bool = False,
+        file_path: str = None,
+        message_id: int = 0,
+    ):
+        self.id = id
+        self.title = title
+        self.duration_sec = duration_sec
+        self.user = user
+        self.user_id = user_id
+        self.video = video
+        self.file_path = file_path
+        self.message_id = message_id
+
+    @property
+    def duration(self) -> str:
+        return format_duration(self.duration_sec)
 
 
 @dataclass
-class Track:
-    id: str
-    channel_name: str
-    duration: str
-    duration_sec: int
-    title: str
-    url: str
-    file_path: str = None
-    message_id: int = 0
-    time: int = 0
-    thumbnail: str = None
-    user: str = None
-    user_id: int = 0
-    view_count: str = None
-    video: bool = False
+class ChatSettings:
+    loop_mode: str = "normal"
+    video_mode: bool = True
+    video_quality: str = "720p"
+    drama_mode: bool = True
+    admin_play: bool = False
+    cmd_delete: bool = False
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "ChatSettings":
+        """Build settings from a chats document, keeping defaults for missing keys."""
+        return cls(**{
+            key: doc[key] for key in cls.__dataclass_fields__ if key in doc
+        })
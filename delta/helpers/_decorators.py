@@ -3,12 +3,13 @@
 # This file is part of AnonXMusic
 
 import logging
-from collections import defaultdict
 from functools import wraps
 from time import time
 
 from pyrogram import enums
 
+from delta.helpers._cache import BoundedCache
+
 # Use direct logging to avoid circular import
 logger = logging.getLogger(__name__)
 
@@ -24,8 +25,9 @@ class RateLimiter:
         """
         self.max_calls = max_calls
         self.period = period
-        self.calls = defaultdict(list)
-        self.blocked_until = {}
+        # Users idle for a whole period have nothing left to remember
+        self.calls = BoundedCache(maxsize=10000, ttl=period)
+        self.blocked_until = BoundedCache(maxsize=10000, ttl=period)
     
     def is_allowed(self, user_id: int) -> tuple[bool, int]:
         """
@@ -37,21 +39,23 @@ class RateLimiter:
         now = time()
         
         # Check if user is temporarily blocked
-        if user_id in self.blocked_until:
-            if now < self.blocked_until[user_id]:
-                retry_after = int(self.blocked_until[user_id] - now)
+        blocked_until = self.blocked_until.get(user_id)
+        if blocked_until is not None:
+            if now < blocked_until:
+                retry_after = int(blocked_until - now)
                 return False, retry_after
             else:
-                del self.blocked_until[user_id]
+                self.blocked_until.pop(user_id)
         
         # Remove old calls
-        self.calls[user_id] = [
-            call_time for call_time in self.calls[user_id]
+        calls = [
+            call_time for call_time in self.calls.get(user_id, [])
             if now - call_time < self.period
         ]
+        self.calls[user_id] = calls
         
         # Check if limit exceeded
-        if len(self.calls[user_id]) >= self.max_calls:
+        if len(calls) >= self.max_calls:
             # Block user for the period
             self.blocked_until[user_id] = now + self.period
             retry_after = self.period
@@ -59,7 +63,7 @@ class RateLimiter:
             return False, retry_after
         
         # Allow the call
-        self.calls[user_id].append(now)
+        calls.append(now)
         return True, 0
     
     def reset(self, user_id: int) -> None:
@@ -79,7 +83,7 @@ class RateLimiter:
             "calls_made": len(recent_calls),
             "calls_remaining": max(0, self.max_calls - len(recent_calls)),
             "reset_in": self.period - (now - recent_calls[0]) if recent_calls else 0,
-            "is_blocked": user_id in self.blocked_until and now < self.blocked_until[user_id]
+            "is_blocked": now < self.blocked_until.get(user_id, 0)
         }
 
 
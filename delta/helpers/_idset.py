@@ -0,0 +1,97 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+
+from array import array
+from bisect import bisect_left
+
+
+class IdSet:
+    """
+    Set of Telegram ids stored as a sorted array of 64-bit integers.
+
+    Lookups are a binary search over 8 bytes per id instead of a Python
+    set's per-entry objects. Recent additions and removals are kept in two
+    small sets and merged into the array once they grow past ``threshold``.
+    Anything but an integer (e.g. a legacy ObjectId) is ignored.
+    """
+
+    def __init__(self, ids=(), threshold: int = 1024):
+        self.threshold = threshold
+        self.base = array("q", sorted({i for i in ids if type(i) is int}))
+        self.added: set[int] = set()
+        self.removed: set[int] = set()
+
+    def _in_base(self, _id: int) -> bool:
+        if type(_id) is not int:
+            return False
+        i = bisect_left(self.base, _id)
+        return i < len(self.base) and self.base[i] == _id
+
+    def __contains__(self, _id: int) -> bool:
+        if _id in self.added:
+            return True
+        if _id in self.removed:
+            return False
+        return self._in_base(_id)
+
+    def add(self, _id: int) -> bool:
+        """Add an id; return False if it was already present or is not an integer."""
+        if type(_id) is not int or _id in self:
+            return False
+        if _id in self.removed:
+            self.removed.discard(_id)
+        else:
+            self.added.add(_id)
+        self._maybe_compact()
+        return True
+
+    def discard(self, _id: int) -> bool:
+        """Remove an id; return False if it was not present."""
+        if _id in self.added:
+            self.added.discard(_id)
+            return True
+        if _id in self.removed or not self._in_base(_id):
+            return False
+        self.removed.add(_id)
+        self._maybe_compact()
+        return True
+
+    def update(self, ids) -> None:
+        for _id in ids:
+            self.add(_id)
+
+    def _maybe_compact(self) -> None:
+        if len(self.added) + len(self.removed) >= self.threshold:
+            self.compact()
+
+    def compact(self) -> None:
+        """Merge pending additions and removals into the sorted array."""
+        # One pass: the runs between changes are copied as array slices.
+        # Pending removals are always in the array and additions never are.
+        merged, start = array("q"), 0
+        for _id in sorted(self.added | self.removed):
+            i = bisect_left(self.base, _id, start)
+            merged.extend(self.base[start:i])
+            if _id in self.added:
+                merged.append(_id)
+                start = i
+            else:
+                start = i + 1
+        merged.extend(self.base[start:])
+        self.base = merged
+        self.added.clear()
+        self.removed.clear()
+
+    def __iter__(self):
+        for _id in self.base:
+            if _id not in self.removed:
+                yield _id
+        yield from list(self.added)
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.added) - len(self.removed)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
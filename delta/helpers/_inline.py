@@ -62,6 +62,7 @@ class Inline:
                 self.ikb(text="📢 Top Groups (Global)", callback_data="GetStatsNow Chats"),
             ],
             [
+                self.ikb(text="📅 Top Tracks (7 Hari)", callback_data="GetStatsNow Week"),
                 self.ikb(text="🤖 Bot Info", callback_data="TopOverall s"),
             ],
         ]
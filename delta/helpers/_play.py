@@ -23,7 +23,7 @@ def checkUB(play):
         ):
             return await m.reply_text("<b>Penggunaan:</b>\n\n<code>/play attention</code>")
 
-        if len(queue.get_queue(chat_id)) >= config.QUEUE_LIMIT:
+        if queue.size(chat_id) >= config.QUEUE_LIMIT:
             return await m.reply_text(
                 f"Batas antrian ({config.QUEUE_LIMIT}) telah tercapai. Silakan tunggu track dalam antrian selesai diputar, lalu coba lagi."
             )
@@ -48,6 +48,7 @@ def checkUB(play):
                 )
 
         if not await db.get_call(chat_id):
+            await db.rebalance(chat_id)
             client = await db.get_client(chat_id)
             try:
                 member = await app.get_chat_member(chat_id, client.id)
@@ -3,86 +3,209 @@
 # This file is part of AnonXMusic
 
 
-from collections import defaultdict, deque
+import random
+from collections import OrderedDict
+from itertools import count, islice
 from typing import Union
 
-from ._dataclass import Media, Track
+from ._cache import BoundedCache
+from ._dataclass import LazyTrack, Media, Track
 
-MediaItem = Union[Media, Track]
+MediaItem = Union[Media, Track, LazyTrack]
+
+# Node keys are unique across all queues of the process
+_keys = count()
+
+
+class ChatQueue:
+    """
+    Queue of one chat with an index from item id to its nodes.
+
+    Items live in an OrderedDict keyed by a unique node key, so the head,
+    the tail and any node can be removed or moved to either end in O(1).
+    ``index`` maps an item id to the node keys holding it, which allows the
+    same track to be queued more than once.
+    """
+
+    __slots__ = ("nodes", "index")
+
+    def __init__(self):
+        self.nodes: OrderedDict[int, MediaItem] = OrderedDict()
+        self.index: dict[str, dict[int, None]] = {}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def append(self, item: MediaItem, left: bool = False) -> int:
+        key = next(_keys)
+        self.nodes[key] = item
+        if left:
+            self.nodes.move_to_end(key, last=False)
+        self.index.setdefault(item.id, {})[key] = None
+        return key
+
+    def pop(self, key: int) -> MediaItem:
+        item = self.nodes.pop(key)
+        keys = self.index[item.id]
+        del keys[key]
+        if not keys:
+            del self.index[item.id]
+        return item
+
+    def head(self) -> int | None:
+        return next(iter(self.nodes), None)
+
+    def find(self, item_id: str, skip_head: bool = True) -> int | None:
+        """Return the node key of a queued item, ignoring the playing one by default."""
+        head = self.head() if skip_head else None
+        return next((key for key in self.index.get(item_id, ()) if key != head), None)
+
+    def clear(self) -> None:
+        self.nodes.clear()
+        self.index.clear()
+
+
+# Shared stand-in returned for chats without a queue; never appended to.
+EMPTY = ChatQueue()
 
 
 class Queue:
     def __init__(self):
-        self.queues: dict[int, deque[MediaItem]] = defaultdict(deque)
+        # Only chats with queued items are kept; a queue nobody touched for
+        # a day (no playback, no commands) is dropped.
+        self.queues = BoundedCache(maxsize=0, ttl=86400, name="queues")
+        self.dirty: set[int] = set()
+
+    def _get(self, chat_id: int) -> ChatQueue:
+        return self.queues.get(chat_id, EMPTY)
+
+    def _prune(self, chat_id: int) -> None:
+        if not self.queues.get(chat_id):
+            self.queues.pop(chat_id)
 
     def add(self, chat_id: int, item: MediaItem) -> int:
         """Add an item to the queue and return its position (1-based)."""
-        self.queues[chat_id].append(item)
-        return len(self.queues[chat_id]) - 1
-
-    def check_item(self, chat_id: int, item_id: str) -> tuple[int, MediaItem | None]:
-        """Check if an item with the given ID exists in the queue."""
-        pos, track = next(
-            (
-                (i, track)
-                for i, track in enumerate(list(self.queues[chat_id]))
-                if track.id == item_id
-            ),
-            (-1, None),
-        )
-        return pos, track
-
-    def force_add(
-        self, chat_id: int, item: MediaItem, remove: int | bool = False
-    ) -> None:
+        cq = self.queues.setdefault(chat_id, ChatQueue)
+        cq.append(item)
+        self.dirty.add(chat_id)
+        return len(cq) - 1
+
+    def find(self, chat_id: int, item_id: str) -> MediaItem | None:
+        """Return a queued (not playing) item with the given ID, if any."""
+        cq = self._get(chat_id)
+        key = cq.find(item_id)
+        return cq.nodes[key] if key is not None else None
+
+    def remove(self, chat_id: int, item_id: str) -> MediaItem | None:
+        """Remove a queued (not playing) item by ID and return it."""
+        cq = self._get(chat_id)
+        key = cq.find(item_id)
+        if key is None:
+            return None
+        self.dirty.add(chat_id)
+        item = cq.pop(key)
+        self._prune(chat_id)
+        return item
+
+    def move_to_next(self, chat_id: int, item_id: str) -> MediaItem | None:
+        """Move a queued item right behind the currently playing one."""
+        cq = self._get(chat_id)
+        key = cq.find(item_id)
+        if key is None:
+            return None
+        head = cq.head()
+        cq.nodes.move_to_end(key, last=False)
+        cq.nodes.move_to_end(head, last=False)
+        self.dirty.add(chat_id)
+        return cq.nodes[key]
+
+    def promote(self, chat_id: int, item_id: str) -> MediaItem | None:
+        """Replace the currently playing item with a queued one and return it."""
+        cq = self._get(chat_id)
+        key = cq.find(item_id)
+        if key is None:
+            return None
+        self.remove_current(chat_id)
+        cq.nodes.move_to_end(key, last=False)
+        self.dirty.add(chat_id)
+        return cq.nodes[key]
+
+    def force_add(self, chat_id: int, item: MediaItem) -> None:
         """Replace the currently playing item with a new one."""
         self.remove_current(chat_id)
-        self.queues[chat_id].appendleft(item)
-        if remove:
-            self.queues[chat_id].rotate(-remove)
-            self.queues[chat_id].popleft()
-            self.queues[chat_id].rotate(remove)
+        self.queues.setdefault(chat_id, ChatQueue).append(item, left=True)
+        self.dirty.add(chat_id)
 
     def get_current(self, chat_id: int) -> MediaItem | None:
         """Return the currently playing item (first in queue), if any."""
-        return self.queues[chat_id][0] if self.queues[chat_id] else None
+        cq = self._get(chat_id)
+        key = cq.head()
+        return cq.nodes[key] if key is not None else None
 
     def get_next(self, chat_id: int, check: bool = False) -> MediaItem | None:
         """Remove current item and return the next one, or None if empty."""
-        if not self.queues[chat_id]:
+        cq = self._get(chat_id)
+        if not cq:
             return None
         if check:
-            return self.queues[chat_id][1] if len(self.queues[chat_id]) > 1 else None
-
-        self.queues[chat_id].popleft()
-        return self.queues[chat_id][0] if self.queues[chat_id] else None
+            nodes = iter(cq.nodes.values())
+            next(nodes)
+            return next(nodes, None)
+
+        cq.pop(cq.head())
+        self.dirty.add(chat_id)
+        self._prune(chat_id)
+        return self.get_current(chat_id)
+
+    def peek(self, chat_id: int, count: int) -> list[MediaItem]:
+        """Return up to ``count`` items queued after the current one."""
+        return list(islice(self._get(chat_id).nodes.values(), 1, count + 1))
+
+    def replace(self, chat_id: int, item: MediaItem, new: MediaItem) -> bool:
+        """Swap a queued item for another one with the same ID, in place."""
+        cq = self._get(chat_id)
+        for key in cq.index.get(item.id, ()):
+            if cq.nodes[key] is item:
+                cq.nodes[key] = new
+                self.dirty.add(chat_id)
+                return True
+        return False
+
+    def size(self, chat_id: int) -> int:
+        """Return the number of items in the queue, including the current one."""
+        return len(self._get(chat_id))
 
     def get_queue(self, chat_id: int) -> list[MediaItem]:
         """Return the full queue including the currently playing item."""
-        return list(self.queues[chat_id])
+        return list(self._get(chat_id).nodes.values())
+
+    def get_nodes(self, chat_id: int) -> list[tuple[int, MediaItem]]:
+        """Return the full queue as ``(node key, item)`` pairs, e.g. to diff it."""
+        return list(self._get(chat_id).nodes.items())
 
     def remove_current(self, chat_id: int) -> None:
         """Remove the currently playing item only (if exists)."""
-        if self.queues[chat_id]:
-            self.queues[chat_id].popleft()
+        cq = self._get(chat_id)
+        if cq:
+            cq.pop(cq.head())
+            self.dirty.add(chat_id)
+            self._prune(chat_id)
 
     def shuffle(self, chat_id: int) -> bool:
         """Shuffle the queue (except currently playing item). Returns True if successful."""
-        if len(self.queues[chat_id]) <= 1:
+        cq = self._get(chat_id)
+        if len(cq) <= 1:
             return False  # Nothing to shuffle
-        
-        import random
-        # Get current item and remaining queue
-        current = self.queues[chat_id][0]
-        remaining = list(self.queues[chat_id])[1:]
-        
-        # Shuffle remaining items
-        random.shuffle(remaining)
-        
-        # Rebuild queue with current item first
-        self.queues[chat_id] = deque([current] + remaining)
+
+        # Keep the current item first and reorder the rest in place
+        keys = list(cq.nodes)[1:]
+        random.shuffle(keys)
+        for key in keys:
+            cq.nodes.move_to_end(key)
+        self.dirty.add(chat_id)
         return True
 
     def clear(self, chat_id: int) -> None:
         """Clear the entire queue."""
-        self.queues[chat_id].clear()
+        self.queues.pop(chat_id)
+        self.dirty.add(chat_id)
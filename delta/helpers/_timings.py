@@ -0,0 +1,54 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+
+from collections import deque
+from contextlib import contextmanager
+from time import monotonic
+
+
+class StageTimings:
+    """
+    Rolling latency samples per named stage.
+
+    Every stage keeps its last ``window`` durations (in milliseconds);
+    ``metrics()`` reports their count and p50/p95/p99.
+    """
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self.samples: dict[str, deque[float]] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = self.samples[stage] = deque(maxlen=self.window)
+        samples.append(seconds * 1000)
+
+    @contextmanager
+    def measure(self, stage: str):
+        """Record the time spent in the ``with`` block, also when it raises."""
+        started = monotonic()
+        try:
+            yield
+        finally:
+            self.record(stage, monotonic() - started)
+
+    @staticmethod
+    def percentile(ordered: list[float], pct: float) -> float:
+        # Nearest-rank on an already sorted sample.
+        index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def metrics(self) -> dict[str, dict]:
+        result = {}
+        for stage, samples in self.samples.items():
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+            result[stage] = {
+                "count": len(ordered),
+                **{f"p{pct}": round(self.percentile(ordered, pct)) for pct in (50, 95, 99)},
+            }
+        return result
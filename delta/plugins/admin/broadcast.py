@@ -7,7 +7,7 @@ import asyncio
 
 from pyrogram import enums, filters, types
 
-from delta import app, db
+from delta import app, db, logger
 
 
 @app.on_message(filters.command(["broadcast", "gcast"]) & filters.user(app.owner))
@@ -21,26 +21,33 @@ async def broadcast_message(_, message: types.Message):
         )
     
     mode = "chats" if message.command[0] == "gcast" else "users"
-    targets = await db.get_chats() if mode == "chats" else await db.get_users()
+    total = await db.count_chats() if mode == "chats" else await db.count_users()
+    targets = db.iter_chats() if mode == "chats" else db.iter_users()
     
     sent = await message.reply_text(
-        f"📡 <b>Broadcasting...</b>\n\n<blockquote>Target: {len(targets)} {mode}</blockquote>",
+        f"📡 <b>Broadcasting...</b>\n\n<blockquote>Target: ~{total} {mode}</blockquote>",
         parse_mode=enums.ParseMode.HTML
     )
     
     success = 0
     failed = 0
+    stopped = ""
     
-    for target in targets:
-        try:
-            await message.reply_to_message.copy(target)
-            success += 1
-            await asyncio.sleep(0.5)  # Anti-flood
-        except:
-            failed += 1
+    try:
+        async for target in targets:
+            try:
+                await message.reply_to_message.copy(target)
+                success += 1
+                await asyncio.sleep(0.5)  # Anti-flood
+            except:
+                failed += 1
+    except Exception as e:
+        # Reading the targets failed; still report what was sent
+        logger.error(f"Broadcast stopped early: {e}")
+        stopped = f"\n<b>Terhenti:</b> <code>{type(e).__name__}</code>"
     
     await sent.edit_text(
-        f"✅ <b>Broadcast Selesai</b>\n\n<blockquote><b>Sukses:</b> {success}\n<b>Gagal:</b> {failed}</blockquote>",
+        f"✅ <b>Broadcast Selesai</b>\n\n<blockquote><b>Sukses:</b> {success}\n<b>Gagal:</b> {failed}{stopped}</blockquote>",
         parse_mode=enums.ParseMode.HTML
     )
 
@@ -12,8 +12,9 @@ from datetime import datetime
 
 from pyrogram import enums, filters, types
 
-from delta import app, config, logger
+from delta import app, config, logger, prefetch, scheduler, workers
 from delta.helpers._graceful import graceful_handler, safe_restart, with_flood_wait_handler
+from delta.helpers import BoundedCache
 
 
 # Custom sudo filter that checks at runtime
@@ -106,9 +107,29 @@ async def status_handler(_, message: types.Message):
     disk = psutil.disk_usage('/')
     
     # Get bot stats
-    total_chats = len(await db.get_chats())
-    total_users = len(await db.get_users())
-    active_calls = await db.active_callsdb.count_documents({})
+    total_chats = await db.count_chats()
+    total_users = await db.count_users()
+    active_calls = len(db.active_calls)
+    buffer = db.buffer.metrics()
+    prefetching = prefetch.metrics()
+    ytdl = workers.metrics()
+    downloads = scheduler.metrics()
+    queued = " / ".join(str(n) for n in downloads["queued"].values())
+    waits = ", ".join(
+        f"{name} {t['p95']} ms" for name, t in downloads["wait"].items()
+    ) or "-"
+    assistants = ", ".join(
+        f"#{num}: {calls}" for num, (calls, _) in (await anon.load()).items()
+    )
+    timings = "".join(
+        f"• {stage}: p50 {t['p50']} / p95 {t['p95']} / p99 {t['p99']} ms ({t['count']})\n"
+        for stage, t in anon.timings.metrics().items()
+    ) or "• No transitions yet\n"
+    caches = "".join(
+        f"• {name}: {m['size']}{'/' + str(m['maxsize']) if m['maxsize'] else ''} "
+        f"(evicted {m['evictions'] + m['expirations']})\n"
+        for name, m in ((name, cache.metrics()) for name, cache in BoundedCache.registry.items())
+    )
     
     status_text = (
         f"🤖 <b>Bot Status</b>\n\n"
@@ -123,7 +144,25 @@ async def status_handler(_, message: types.Message):
         f"<b>📈 Bot Stats:</b>\n"
         f"• Groups: {total_chats}\n"
         f"• Users: {total_users}\n"
-        f"• Active Calls: {active_calls}\n\n"
+        f"• Active Calls: {active_calls}\n"
+        f"• Per Assistant: {assistants or '-'}\n\n"
+        f"<b>💾 Write Buffer:</b>\n"
+        f"• Pending: {buffer['pending']} ({buffer['oldest_age']}s)\n"
+        f"• Flushes: {buffer['flushes']} ({buffer['last_flush_ms']} ms)\n"
+        f"• Errors: {buffer['errors']}\n\n"
+        f"<b>⏬ Prefetch:</b>\n"
+        f"• Running: {prefetching['running']} in {prefetching['chats']} chats\n"
+        f"• Cancelled: {prefetching['cancelled']}\n"
+        f"• yt-dlp Workers: {ytdl['workers'] or 'threads'} ({ytdl['jobs']} jobs)\n\n"
+        f"<b>📥 Downloads:</b>\n"
+        f"• Running: {downloads['running']}/{downloads['limit']} "
+        f"({', '.join(f'{h}: {n}' for h, n in downloads['hosts'].items()) or 'idle'})\n"
+        f"• Queued now/next/user/warm: {queued}\n"
+        f"• Wait p95: {waits}\n\n"
+        f"<b>⏭ Transitions:</b>\n"
+        f"{timings}\n"
+        f"<b>🗂 Caches:</b>\n"
+        f"{caches}\n"
         f"<b>⚡ FloodWait:</b>\n"
         f"• Count: {flood_handler.flood_wait_count}\n"
         f"• Shutdown: {'🛑 Yes' if graceful_handler.is_shutting_down else '✅ No'}"
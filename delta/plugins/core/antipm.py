@@ -6,6 +6,7 @@
 
 import asyncio
 from pyrogram import enums, filters
+from pyrogram.handlers import MessageHandler
 from pyrogram.types import Message
 
 from delta import config, db, userbot
@@ -37,9 +38,6 @@ async def load_custom_messages():
 
 
 # Auto Clear PM Handler
-@userbot.one.on_message(filters.private & filters.incoming, group=1)
-@userbot.two.on_message(filters.private & filters.incoming, group=1)
-@userbot.three.on_message(filters.private & filters.incoming, group=1)
 async def pm_auto_clear(client, message: Message):
     """Auto clear PM messages after 3 seconds without blocking."""
     
@@ -84,9 +82,6 @@ async def pm_auto_clear(client, message: Message):
 
 
 # Approve command (for owner only)
-@userbot.one.on_message(filters.command("approve", prefixes=".") & filters.me)
-@userbot.two.on_message(filters.command("approve", prefixes=".") & filters.me)
-@userbot.three.on_message(filters.command("approve", prefixes=".") & filters.me)
 async def approve_pm(client, message: Message):
     """Approve a user to PM (disable auto clear for them)."""
     if message.reply_to_message:
@@ -104,9 +99,6 @@ async def approve_pm(client, message: Message):
 
 
 # Disapprove command (for owner only)
-@userbot.one.on_message(filters.command("disapprove", prefixes=".") & filters.me)
-@userbot.two.on_message(filters.command("disapprove", prefixes=".") & filters.me)
-@userbot.three.on_message(filters.command("disapprove", prefixes=".") & filters.me)
 async def disapprove_pm(client, message: Message):
     """Disapprove a user (enable auto clear)."""
     if message.reply_to_message:
@@ -124,9 +116,6 @@ async def disapprove_pm(client, message: Message):
 
 
 # Set custom warning message
-@userbot.one.on_message(filters.command("setpmwarn", prefixes=".") & filters.me)
-@userbot.two.on_message(filters.command("setpmwarn", prefixes=".") & filters.me)
-@userbot.three.on_message(filters.command("setpmwarn", prefixes=".") & filters.me)
 async def set_pm_warn(client, message: Message):
     """Set custom PM warning message."""
     global CUSTOM_PM_WARN
@@ -148,9 +137,6 @@ async def set_pm_warn(client, message: Message):
 
 
 # Reset to default messages
-@userbot.one.on_message(filters.command("resetpm", prefixes=".") & filters.me)
-@userbot.two.on_message(filters.command("resetpm", prefixes=".") & filters.me)
-@userbot.three.on_message(filters.command("resetpm", prefixes=".") & filters.me)
 async def reset_pm_messages(client, message: Message):
     """Reset PM messages to default."""
     global CUSTOM_PM_WARN
@@ -164,9 +150,6 @@ async def reset_pm_messages(client, message: Message):
 
 
 # PMPermit help command
-@userbot.one.on_message(filters.command("pmhelp", prefixes=".") & filters.me)
-@userbot.two.on_message(filters.command("pmhelp", prefixes=".") & filters.me)
-@userbot.three.on_message(filters.command("pmhelp", prefixes=".") & filters.me)
 async def pm_auto_help(client, message: Message):
     """Show Auto Clear PM help."""
     help_text = (
@@ -184,3 +167,18 @@ async def pm_auto_help(client, message: Message):
     )
     
     await message.reply_text(help_text, parse_mode=enums.ParseMode.HTML)
+
+
+# Register every handler on each assistant in the pool
+HANDLERS = [
+    (pm_auto_clear, filters.private & filters.incoming),
+    (approve_pm, filters.command("approve", prefixes=".") & filters.me),
+    (disapprove_pm, filters.command("disapprove", prefixes=".") & filters.me),
+    (set_pm_warn, filters.command("setpmwarn", prefixes=".") & filters.me),
+    (reset_pm_messages, filters.command("resetpm", prefixes=".") & filters.me),
+    (pm_auto_help, filters.command("pmhelp", prefixes=".") & filters.me),
+]
+
+for client in userbot.pool:
+    for callback, handler_filter in HANDLERS:
+        client.add_handler(MessageHandler(callback, handler_filter), group=1)
@@ -7,7 +7,7 @@ import re
 
 from pyrogram import enums, filters, types
 
-from delta import anon, app, db, queue, tg, yt
+from delta import anon, app, db, queue, scheduler, tg, yt
 from delta.helpers import admin_check, buttons, can_manage_vc
 
 
@@ -96,12 +96,12 @@ async def _controls(_, query: types.CallbackQuery):
         reply = f"{user} melewati streaming."
 
     elif action == "force":
-        pos, media = queue.check_item(chat_id, args[3])
-        if not media or pos == -1:
+        current = queue.get_current(chat_id)
+        media = await anon.resolve(chat_id, queue.promote(chat_id, args[3]))
+        if not media:
             return await query.edit_message_text("Lagu ini telah kadaluarsa dari antrian.")
 
-        m_id = queue.get_current(chat_id).message_id
-        queue.force_add(chat_id, media, remove=pos)
+        m_id = current.message_id if current else None
         try:
             await app.delete_messages(
                 chat_id=chat_id, message_ids=[m_id, media.message_id], revoke=True
@@ -112,7 +112,7 @@ async def _controls(_, query: types.CallbackQuery):
 
         msg = await app.send_message(chat_id=chat_id, text="Memutar lagu selanjutnya...")
         if not media.file_path:
-            media.file_path = await yt.download(media.id, video=media.video)
+            media.file_path = await yt.download(media.id, video=media.video, priority=scheduler.NOW)
         media.message_id = msg.id
         return await anon.play_media(chat_id, msg, media)
 
@@ -276,12 +276,13 @@ async def player_settings_cmd(_, message: types.Message):
     chat_id = message.chat.id
     
     # Get current settings
-    loop_mode = await db.get_loop_mode(chat_id)
-    admin_only = await db.get_play_mode(chat_id)
-    cmd_delete = await db.get_cmd_delete(chat_id)
-    video_mode = await db.get_video_mode(chat_id)
-    video_quality = await db.get_video_quality(chat_id)
-    drama_mode = await db.get_drama_mode(chat_id)
+    settings = await db.get_settings(chat_id)
+    loop_mode = settings.loop_mode
+    admin_only = settings.admin_play
+    cmd_delete = settings.cmd_delete
+    video_mode = settings.video_mode
+    video_quality = settings.video_quality
+    drama_mode = settings.drama_mode
     
     # Format loop mode display
     loop_text = {
@@ -318,11 +319,13 @@ async def _player_settings_cb(_, query: types.CallbackQuery):
     await query.answer("Memproses...", show_alert=True)
 
     chat_id = query.message.chat.id
-    loop_mode = await db.get_loop_mode(chat_id)
-    admin_only = await db.get_play_mode(chat_id)
-    cmd_delete = await db.get_cmd_delete(chat_id)
-    video_mode = await db.get_video_mode(chat_id)
-    drama_mode = await db.get_drama_mode(chat_id)
+    settings = await db.get_settings(chat_id)
+    loop_mode = settings.loop_mode
+    admin_only = settings.admin_play
+    cmd_delete = settings.cmd_delete
+    video_mode = settings.video_mode
+    video_quality = settings.video_quality
+    drama_mode = settings.drama_mode
 
     if cmd[1] == "loop":
         # Cycle through loop modes
@@ -346,7 +349,6 @@ async def _player_settings_cb(_, query: types.CallbackQuery):
     elif cmd[1] == "quality":
         # Cycle through quality options
         qualities = ["360p", "480p", "720p", "1080p"]
-        video_quality = await db.get_video_quality(chat_id)
         current_idx = qualities.index(video_quality) if video_quality in qualities else 2
         new_quality = qualities[(current_idx + 1) % len(qualities)]
         await db.set_video_quality(chat_id, new_quality)
@@ -358,10 +360,6 @@ async def _player_settings_cb(_, query: types.CallbackQuery):
             pass
         return
     
-    # Get video quality if not already set
-    if 'video_quality' not in dir():
-        video_quality = await db.get_video_quality(chat_id)
-    
     # Format loop mode display
     loop_text = {
         "normal": "▶️ Normal",
@@ -3,10 +3,9 @@
 # This file is part of AnonXMusic
 
 
-from py_yt import VideosSearch
 from pyrogram import types
 
-from delta import app
+from delta import app, yt
 from delta.helpers import buttons
 
 
@@ -17,8 +16,7 @@ async def inline_query_handler(_, query: types.InlineQuery):
         return
 
     try:
-        search = VideosSearch(text, limit=15)
-        results = (await search.next()).get("result", [])
+        results = await yt.search_results(text, limit=15)
 
         answers = []
         for video in results:
@@ -8,7 +8,7 @@ import time
 
 from pyrogram import enums, errors, filters, types
 
-from delta import anon, app, config, db, queue, tasks, userbot, yt
+from delta import anon, app, clock, config, db, queue, tasks, userbot
 from delta.helpers import buttons
 
 
@@ -43,39 +43,22 @@ async def auto_leave():
                 continue
 
 
-async def track_time():
-    while True:
-        await asyncio.sleep(1)
-        for chat_id in await db.get_active_calls():
-            if not await db.playing(chat_id):
-                continue
-            media = queue.get_current(chat_id)
-            if not media:
-                continue
-            media.time += 1
-
-
 async def update_timer(length=10):
     while True:
         await asyncio.sleep(7)
-        for chat_id in await db.get_active_calls():
-            if not await db.playing(chat_id):
+        for chat_id in clock.chats():
+            if clock.is_paused(chat_id):
                 continue
             try:
                 media = queue.get_current(chat_id)
+                played = clock.elapsed(chat_id)
                 duration, message_id = media.duration_sec, media.message_id
-                if not duration or not message_id or not media.time:
+                if not duration or not message_id or not played:
                     continue
-                played = media.time
                 remaining = duration - played
                 pos = min(int((played / duration) * length), length - 1)
                 timer = "—" * pos + "◉" + "—" * (length - pos - 1)
 
-                if remaining <= 30:
-                    next = queue.get_next(chat_id, check=True)
-                    if next and not next.file_path:
-                        next.file_path = await yt.download(next.id, video=next.video)
-
                 if remaining < 10:
                     remove = True
                 else:
@@ -96,11 +79,11 @@ async def update_timer(length=10):
 async def vc_watcher(sleep=15):
     while True:
         await asyncio.sleep(sleep)
-        for chat_id in await db.get_active_calls():
+        for chat_id in clock.chats():
             client = await db.get_assistant(chat_id)
             media = queue.get_current(chat_id)
             participants = await client.get_participants(chat_id)
-            if len(participants) < 2 and media.time > 30:
+            if media and len(participants) < 2 and (clock.elapsed(chat_id) or 0) > 30:
                 try:
                     sent = await app.edit_message_reply_markup(
                         chat_id=chat_id,
@@ -119,5 +102,4 @@ if config.AUTO_END:
     tasks.append(asyncio.create_task(vc_watcher()))
 if config.AUTO_LEAVE:
     tasks.append(asyncio.create_task(auto_leave()))
-tasks.append(asyncio.create_task(track_time()))
 tasks.append(asyncio.create_task(update_timer()))
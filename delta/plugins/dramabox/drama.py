@@ -9,7 +9,7 @@ Command untuk mengakses konten DramaBox dari Telegram.
 """
 
 from pyrogram import enums, filters, types
-from delta import app, anon, db, queue
+from delta import app, anon, db, queue, scheduler
 from delta.helpers import Media, is_admin
 from delta.helpers._graceful import with_flood_wait_handler
 from .api import dramabox, Drama, Episode
@@ -474,6 +474,7 @@ async def drama_download_callback(_, callback: types.CallbackQuery):
     import aiohttp
     import os
     import asyncio
+    from urllib.parse import urlparse
     
     parts = callback.data.split(":")
     book_id = parts[1]
@@ -525,7 +526,7 @@ async def drama_download_callback(_, callback: types.CallbackQuery):
     
     try:
         # Download dari URL
-        async with aiohttp.ClientSession() as session:
+        async with scheduler.slot(scheduler.USER, urlparse(video_url).hostname), aiohttp.ClientSession() as session:
             async with session.get(video_url) as response:
                 if response.status != 200:
                     raise Exception(f"HTTP {response.status}")
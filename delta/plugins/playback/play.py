@@ -7,18 +7,24 @@ from pathlib import Path
 
 from pyrogram import enums, filters, types
 
-from delta import anon, app, config, db, queue, tg, yt
+from delta import anon, app, config, db, queue, scheduler, tg, yt
 from delta.helpers import buttons, utils
 from delta.helpers._play import checkUB
 
 
 def playlist_to_queue(chat_id: int, tracks: list) -> str:
     text = "<blockquote expandable>"
+    listed = 0
     for track in tracks:
         pos = queue.add(chat_id, track)
-        text += f"<b>{pos}.</b> {track.title}\n"
-    text = text[:1948] + "</blockquote>"
-    return text
+        # Long playlists only list what fits in one message
+        line = f"<b>{pos}.</b> {track.title}\n"
+        if len(text) + len(line) <= 1900:
+            text += line
+            listed += 1
+    if listed < len(tracks):
+        text += f"... +{len(tracks) - listed}\n"
+    return text + "</blockquote>"
 
 @app.on_message(
     filters.command(["play", "playforce", "vplay", "vplayforce"])
@@ -74,7 +80,7 @@ async def play_hndlr(
                 parse_mode=enums.ParseMode.HTML
             )
             tracks = await yt.playlist(
-                config.PLAYLIST_LIMIT, mention, url, video
+                config.PLAYLIST_LIMIT, mention, url, video, m.from_user.id
             )
 
             if not tracks:
@@ -85,10 +91,10 @@ async def play_hndlr(
                 await utils.auto_delete(sent)
                 return
 
-            file = tracks[0]
-            tracks.remove(file)
-            file.message_id = sent.id
-            file.user_id = m.from_user.id  # Set user_id for the first track
+            # Only the first track is resolved now, the rest stay lazy
+            first = tracks.pop(0)
+            first.message_id = sent.id
+            file = await yt.resolve(first)
         else:
             file = await yt.search(url, sent.id, video=video, user_id=m.from_user.id)
 
@@ -113,7 +119,11 @@ async def play_hndlr(
 
     elif media:
         # removed setattr lang
-        file = await tg.download(m.reply_to_message, sent)
+        # The chat waits on the file unless something is already playing
+        idle = force or not queue.get_current(m.chat.id)
+        file = await tg.download(
+            m.reply_to_message, sent, scheduler.NOW if idle else scheduler.USER
+        )
 
     if not file:
         await sent.edit_text(
@@ -164,7 +174,7 @@ async def play_hndlr(
             file.file_path = fname
         else:
             await sent.edit_text("⏳ <b>Sedang memproses, harap tunggu...</b>", parse_mode=enums.ParseMode.HTML)
-            file.file_path = await yt.download(file.id, video=video)
+            file.file_path = await yt.download(file.id, video=video, priority=scheduler.NOW)
 
     await anon.play_media(chat_id=m.chat.id, message=sent, media=file)
     if not tracks:
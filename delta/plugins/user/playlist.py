@@ -89,16 +89,13 @@ async def playlist_callback(_, query: types.CallbackQuery):
         )
         
         # Add tracks to queue
-        from delta.helpers._dataclass import Track
+        from delta.helpers._dataclass import LazyTrack
         for track in playlist:
-            t = Track(
+            t = LazyTrack(
                 id=track["track_id"],
-                channel_name="Playlist",
-                duration=track.get("duration", "0:00"),
-                duration_sec=0,
                 title=track["title"],
-                url=track.get("url", ""),
-                user=query.from_user.mention
+                user=query.from_user.mention,
+                user_id=query.from_user.id,
             )
             queue.add(chat_id, t)
         
@@ -5,7 +5,7 @@
 
 from pyrogram import enums, filters, types
 
-from delta import app, config, yt
+from delta import app, config, scheduler, yt
 
 
 @app.on_message(filters.command(["song", "mp3"]) & ~app.bl_users)
@@ -72,7 +72,8 @@ async def song_command(_, message: types.Message):
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 ydl.extract_info(yturl, download=True)
         
-        await asyncio.to_thread(_download)
+        async with scheduler.slot(scheduler.USER, "youtube"):
+            await asyncio.to_thread(_download)
         
         # File will be .mp3 after conversion
         file_path = f"downloads/{safe_title}.mp3"
@@ -56,11 +56,10 @@ async def stats_command(_, m: types.Message):
                 continue
     
     # Get group ranking
-    all_groups = await db.get_top_chats(limit=1000)
+    rank = await db.get_chat_rank(chat_id)
     group_rank = "N/A"
-    if chat_id in all_groups:
-        rank_position = list(all_groups.keys()).index(chat_id) + 1
-        total_groups = len(all_groups)
+    if rank:
+        rank_position, total_groups = rank
         group_rank = f"#{rank_position} dari {total_groups}"
     
     caption = f"""📊 <b>Statistik {m.chat.title}</b>
@@ -92,7 +91,7 @@ async def get_stats_callback(_, query: types.CallbackQuery):
     chat_id = query.message.chat.id
     
     # Menyesuaikan label target (Tracks diganti Artist)
-    target_display = "Artist" if what == "Tracks" else what
+    target_display = "Artist" if what in ("Tracks", "Week") else what
     target = f"Grup {query.message.chat.title}" if what == "Here" else target_display
     
     await query.edit_message_caption(
@@ -107,6 +106,8 @@ async def get_stats_callback(_, query: types.CallbackQuery):
         stats = await db.get_top_users()
     elif what == "Chats":
         stats = await db.get_top_chats()
+    elif what == "Week":
+        stats = await db.get_top_tracks(days=7)
     elif what == "Here":
         stats = await db.get_group_stats(chat_id)
     elif what == "UsersHere":
@@ -128,7 +129,7 @@ async def get_stats_callback(_, query: types.CallbackQuery):
     total_plays = 0
     from delta.helpers import utils
 
-    if what in ["Tracks", "Here"]:
+    if what in ["Tracks", "Week", "Here"]:
         # LOGIKA BARU: TOP ARTIST (MENGELOMPOKKAN TRACKS BERDASARKAN ARTIST)
         artist_counts = {}
         for track_id, data in stats.items():
@@ -158,6 +159,11 @@ async def get_stats_callback(_, query: types.CallbackQuery):
             header += f"🎶 <b>Total Artists:</b> {utils.format_number(len(artist_counts))}\n"
             header += f"▶️ <b>Total Plays:</b> {utils.format_number(total_plays)}</blockquote>\n\n"
             header += f"<b>🏆 Top {limit} Most Played Artists:</b>\n\n<blockquote>"
+        elif what == "Week":
+            header = f"👨‍🎤 <b>Top Artist 7 Hari Terakhir</b>\n\n"
+            header += f"<blockquote>🎶 <b>Total Artists:</b> {utils.format_number(len(artist_counts))}\n"
+            header += f"▶️ <b>Total Plays:</b> {utils.format_number(total_plays)}</blockquote>\n\n"
+            header += f"<b>🏆 Top {limit} Artis Minggu Ini:</b>\n\n<blockquote>"
         else:
             header = f"👨‍🎤 <b>Top Artist Grup</b>\n\n"
             header += f"<blockquote>🎶 <b>Total Artists:</b> {utils.format_number(len(artist_counts))}\n"
@@ -249,8 +255,8 @@ async def overall_stats_callback(_, query: types.CallbackQuery):
     
     from delta.helpers import utils
     
-    served_chats = len(await db.get_chats())
-    served_users = len(await db.get_users())
+    served_chats = await db.count_chats()
+    served_users = await db.count_users()
     total_queries = await db.get_queries()
     blocked = len(db.blacklisted)
     sudoers = len(app.sudoers)
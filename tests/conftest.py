@@ -0,0 +1,39 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+"""
+Helpers are loaded straight from their files: importing ``delta`` itself
+reads the environment and connects to Telegram and MongoDB.
+"""
+
+import importlib.util
+import logging
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="session")
+def load():
+    if "delta" not in sys.modules:
+        package = types.ModuleType("delta")
+        package.__path__ = [str(ROOT / "delta")]
+        package.logger = logging.getLogger("delta")
+        sys.modules["delta"] = package
+
+    def _load(name: str):
+        module = sys.modules.get(name)
+        if module is None:
+            path = ROOT / (name.replace(".", "/") + ".py")
+            spec = importlib.util.spec_from_file_location(name, path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[name] = module
+            spec.loader.exec_module(module)
+        return module
+
+    return _load
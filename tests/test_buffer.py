@@ -0,0 +1,18 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+
+class Collection:
+    name = "queues"
+
+
+def test_dotted_set_on_pending_replace(load):
+    buffer = load("delta.core.buffer").WriteBuffer()
+    queues = Collection()
+    buffer.replace(queues, 1, {"items": [{"id": "a"}, {"id": "b"}], "offset": 0})
+    buffer.set(queues, 1, {"items.1": {"id": "B"}, "items.2": {"id": "c"}, "offset": 1})
+
+    assert buffer.pending["queues"][1] == {
+        "$replace": {"items": [{"id": "a"}, {"id": "B"}, {"id": "c"}], "offset": 1}
+    }
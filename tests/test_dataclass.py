@@ -0,0 +1,55 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+import tracemalloc
+
+
+def _track(dc, i: int, **kwargs):
+    # Fresh strings, as parsed from a search result
+    video_id = f"vid{i:08d}"
+    kwargs = {
+        "id": video_id,
+        "channel_name": "".join(["Some ", "Channel"]),
+        "duration": "3:25",
+        "duration_sec": 205,
+        "title": f"Some song title number {i}",
+        "url": dc.YT_URL + video_id,
+        "thumbnail": f"{dc.YT_THUMB}{video_id}/hq720.jpg",
+        "user": "".join(["<a href='tg://user?id=1'>", "User</a>"]),
+        "view_count": "".join(["1.2M ", "views"]),
+        **kwargs,
+    }
+    return dc.Track(**kwargs)
+
+
+def test_records_are_slotted(load):
+    dc = load("delta.helpers._dataclass")
+    records = (_track(dc, 0), dc.Media(id="a"), dc.LazyTrack(id="b"))
+    for record in records:
+        assert not hasattr(record, "__dict__")
+
+
+def test_url_is_not_made_up(load):
+    dc = load("delta.helpers._dataclass")
+    assert _track(dc, 1).url == dc.YT_URL + "vid00000001"
+    assert _track(dc, 1, url=None).url is None
+    assert _track(dc, 1, url="https://example.com/a.mp3").url == "https://example.com/a.mp3"
+    assert dc.Media(id="tg").url is None
+
+    track = _track(dc, 2)
+    assert dc.Track(**track.to_dict()) == track
+
+
+def test_track_size(load):
+    dc = load("delta.helpers._dataclass")
+    count = 5000
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracks = [_track(dc, i) for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    # The dataclass version took about 700 bytes per track
+    assert size / len(tracks) < 400
@@ -0,0 +1,45 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+
+class ObjectId:
+    """Stand-in for the bson ObjectId keys of legacy documents."""
+
+
+def test_mixed_ids_are_skipped(load):
+    IdSet = load("delta.helpers._idset").IdSet
+    legacy = ObjectId()
+    ids = IdSet([-1001, legacy, 42, 42, "7", 3.0])
+
+    assert sorted(ids) == [-1001, 42]
+    assert legacy not in ids
+    assert not ids.add(legacy)
+    assert not ids.discard(legacy)
+    assert ids.add(7) and 7 in ids
+    assert len(ids) == 3
+
+
+def test_add_discard_compact(load):
+    IdSet = load("delta.helpers._idset").IdSet
+    ids = IdSet(range(10), threshold=4)
+
+    assert not ids.add(5)
+    assert ids.discard(5) and 5 not in ids
+    assert ids.add(20) and ids.add(5)
+    ids.compact()
+    assert list(ids) == sorted(set(range(10)) | {20})
+
+
+def test_compact_merges_in_order(load):
+    IdSet = load("delta.helpers._idset").IdSet
+    ids = IdSet(range(0, 100, 2), threshold=1000)
+    for _id in (-5, 1, 51, 99, 200):
+        ids.add(_id)
+    for _id in (0, 50, 98):
+        ids.discard(_id)
+    expected = sorted(ids)
+    ids.compact()
+
+    assert list(ids.base) == expected
+    assert len(ids) == len(expected)
@@ -0,0 +1,40 @@
+# Copyright (c) 2025 AnonymousX1025
+# Licensed under the MIT License.
+# This file is part of AnonXMusic
+
+from datetime import datetime, timedelta
+
+
+def _rollups(load, now: datetime):
+    module = load("delta.core.rollups")
+    rollups = module.Rollups(None, None, None)
+    rollups.watermarks = {tier: module.floor(now, tier) for tier in ("hour", "day", "month")}
+    return module, rollups
+
+
+def test_cover_recent_range_uses_minutes(load):
+    now = datetime(2026, 5, 20, 15, 42, 30)
+    _, rollups = _rollups(load, now)
+    cover = rollups._cover(now - timedelta(hours=2), now, "month", now)
+
+    assert cover[0] == ("minute", now - timedelta(hours=2), datetime(2026, 5, 20, 14))
+    assert ("hour", datetime(2026, 5, 20, 14), datetime(2026, 5, 20, 15)) in cover
+
+
+def test_cover_skips_expired_tiers(load):
+    now = datetime(2026, 5, 20, 15, 42, 30)
+    module, rollups = _rollups(load, now)
+
+    for days in (7, 60, 500):
+        start = now - timedelta(days=days)
+        cover = rollups._cover(start, now, "month", now)
+        assert cover[0][1] <= start
+        for tier, lo, hi in cover:
+            # Every bucket read must still be there
+            if tier in module.RETENTION:
+                assert lo > now - module.RETENTION[tier], (days, tier, lo)
+
+    start = now - timedelta(days=7)
+    assert rollups._cover(start, now, "month", now)[0] == (
+        "hour", datetime(2026, 5, 13, 15), datetime(2026, 5, 14)
+    )